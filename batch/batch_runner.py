@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from batch.transforms import get_transform
+
+
+@dataclass
+class FileResult:
+    path: str
+    output_path: str
+    seconds: float = 0.0
+    lines: int = 0
+    error: str = None
+
+
+_plugins = None  # loaded once per worker process
+
+
+def _find_plugin(name):
+    global _plugins
+    if _plugins is None:
+        from plugins.plugin_loader import load_plugins
+        _plugins = load_plugins(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plugins'),
+                                verbose=False)
+    for plugin in _plugins:
+        if plugin.get_name().lower() == name.lower():
+            return plugin
+    raise KeyError(f'Unknown plugin {name!r}')
+
+
+def _write_atomically(output_path, source_path, write):
+    # writes into a temporary file next to the target and renames it over the target
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.goatpad-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as file:
+            lines = write(file)
+        shutil.copymode(source_path, temp_path)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return lines
+
+
+def _apply_transform(name, path, output_path):
+    transform = get_transform(name)
+
+    def write(output):
+        count = 0
+        with open(path, 'r', encoding='utf-8', newline='') as source:
+            for line in source:  # stream line by line, the line ending is kept untouched
+                body = line.rstrip('\r\n')
+                output.write(transform(body) + line[len(body):])
+                count += 1
+        return count
+
+    return _write_atomically(output_path, path, write)
+
+
+def _apply_plugin(name, path, output_path):
+    # plugins work on a model, so the file is loaded into a fresh, headless document
+    from editor.text_editor_model import TextEditorModel
+    from stack.undo_manager import UndoManager
+    from clipboard.clipboard_stack import ClipboardStack
+
+    plugin = _find_plugin(name)
+    with open(path, 'r', encoding='utf-8') as file:
+        undo_manager = UndoManager()
+        model = TextEditorModel(file.read(), undo_manager=undo_manager)
+        # the line ending the file uses is written back (files with mixed line endings get '\n')
+        newline = file.newlines if isinstance(file.newlines, str) else '\n'
+    plugin.execute(model, undo_manager, ClipboardStack())
+
+    def write(output):
+        for row, line in enumerate(model.snapshot()):
+            if row:
+                output.write(newline)
+            output.write(line)
+        return len(model.lines)
+
+    return _write_atomically(output_path, path, write)
+
+
+def process_file(kind, name, path, output_path):
+    result = FileResult(path, output_path)
+    start = time.perf_counter()
+    try:
+        if kind == 'transform':
+            result.lines = _apply_transform(name, path, output_path)
+        else:
+            result.lines = _apply_plugin(name, path, output_path)
+    except Exception as e:
+        result.error = f'{type(e).__name__}: {e}'
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def output_paths(paths, output_dir=None):
+    # in place without an output directory; otherwise the files keep their paths relative to the
+    # directory that contains all of them, so a/x.log and b/x.log do not overwrite each other
+    if not output_dir:
+        return list(paths)
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [os.path.join(output_dir, os.path.relpath(os.path.abspath(path), base)) for path in paths]
+
+
+def run_batch(kind, name, paths, output_dir=None, jobs=None):
+    # processes the files in parallel, yielding results as soon as each file is done
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        futures = []
+        for path, output_path in zip(paths, output_paths(paths, output_dir)):
+            futures.append(executor.submit(process_file, kind, name, path, output_path))
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,14 @@
+# line transforms that can be streamed over a file without loading it into a model
+TRANSFORMS = {
+    'upper': str.upper,
+    'lower': str.lower,
+    'title': str.title,
+    'strip-trailing': str.rstrip,
+    'expand-tabs': str.expandtabs,
+}
+
+
+def get_transform(name):
+    if name not in TRANSFORMS:
+        raise KeyError(f'Unknown transform {name!r}, available: {", ".join(sorted(TRANSFORMS))}')
+    return TRANSFORMS[name]
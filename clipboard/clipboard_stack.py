@@ -1,3 +1,5 @@
+import sys
+
 from observers.clipboard.clipboard_observer import ClipboardObserver
 
 
@@ -5,6 +7,7 @@ class ClipboardStack:
     def __init__(self):
         self.texts = []
         self.observers = []
+        self.size = 0  # estimated bytes of all texts, kept up to date by push/pop/clear
 
     def add_observer(self, observer):
         self.observers.append(observer)
@@ -19,6 +22,7 @@ class ClipboardStack:
     def push(self, text):
         # add text to the top of the stack
         self.texts.append(text)
+        self.size += sys.getsizeof(text)
         self.notify_observers()
 
     def pop(self):
@@ -26,6 +30,7 @@ class ClipboardStack:
         if self.is_empty():
             raise IndexError('pop from empty clipboard stack')
         text = self.texts.pop()
+        self.size -= sys.getsizeof(text)
         self.notify_observers()
         return text
 
@@ -41,4 +46,5 @@ class ClipboardStack:
     def clear(self):
         # clears the clipboard stack
         self.texts.clear()
+        self.size = 0
         self.notify_observers()
\ No newline at end of file
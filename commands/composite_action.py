@@ -0,0 +1,47 @@
+import sys
+
+from .edit_action import EditAction
+
+
+class CompositeAction(EditAction):
+    def __init__(self, model, action_factories):
+        # the actions are created one by one while executing, because each of them
+        # (e.g. DeleteAction) captures the document state left by the previous one,
+        # so action_factories may also be a generator that is consumed lazily
+        self.model = model
+        self.action_factories = action_factories
+        self.actions = None
+
+    def execute_do(self):
+        with self.model.suspend_notifications():
+            if self.actions is None:
+                self._execute_first_time()
+            else:
+                for action in self.actions:
+                    action.execute_do()
+
+    def _execute_first_time(self):
+        self.actions = []
+        text_pending = self.model.has_pending_text_notification()
+        try:
+            for factory in self.action_factories:
+                action = factory()
+                action.execute_do()
+                self.actions.append(action)
+        except Exception:
+            # leave the document as it was if any part of the batch fails
+            for action in reversed(self.actions):
+                action.execute_undo()
+            self.actions = None
+            self.model.restore_pending_text_notification(text_pending)
+            raise
+        self.action_factories = None  # not needed anymore, the actions can be replayed
+
+    def execute_undo(self):
+        with self.model.suspend_notifications():
+            for action in reversed(self.actions):
+                action.execute_undo()
+
+    def estimate_size(self):
+        return super().estimate_size() + sys.getsizeof(self.actions) + \
+            sum(action.estimate_size() for action in self.actions or [])
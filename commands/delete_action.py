@@ -1,22 +1,33 @@
+import sys
+
 from .edit_action import EditAction
+from position.location import Location
+from position.location_range import LocationRange
 
 
 class DeleteAction(EditAction):
     def __init__(self, model, selection_range):
         self.model = model
-        self.selection_range = selection_range
+        # own copies, the model moves its cursor location in place and the command may be replayed later
+        start, end = selection_range.start, selection_range.end
+        self.selection_range = LocationRange(Location(start.row, start.column), Location(end.row, end.column))
         # before deleting, we store the text that will be deleted
         self.deleted_text = self.model.get_text_from_range(self.selection_range)
         self.start_location = self.selection_range.start
 
     def execute_do(self):
-        self.model._internal_delete_range(self.selection_range)
+        start = self.selection_range.start
+        self.model._internal_delete_range(LocationRange(Location(start.row, start.column), self.selection_range.end))
         self.model.notify_text_observers()
         self.model.notify_cursor_observers()
 
     def execute_undo(self):
         # to undo the delete, we reinsert the deleted text at the original location
         self.model._internal_insert_text(self.deleted_text, self.start_location)
-        self.model.set_cursor_location(self.selection_range.end)
+        end = self.selection_range.end
+        self.model.set_cursor_location(Location(end.row, end.column))
         self.model.notify_text_observers()
-        self.model.notify_cursor_observers()
\ No newline at end of file
+        self.model.notify_cursor_observers()
+
+    def estimate_size(self):
+        return super().estimate_size() + sys.getsizeof(self.deleted_text)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import sys
 
 class EditAction(ABC):
     @abstractmethod
@@ -9,4 +10,8 @@ class EditAction(ABC):
     @abstractmethod
     def execute_undo(self):
         # undoes the action
-        pass
\ No newline at end of file
+        pass
+
+    def estimate_size(self):
+        # rough number of bytes the action keeps alive, subclasses add the text they store
+        return sys.getsizeof(self)
@@ -1,17 +1,20 @@
+import sys
 
 from .edit_action import EditAction
+from position.location import Location
 from position.location_range import LocationRange
 
 class InsertTextAction(EditAction):
     def __init__(self, model, text, location):
         self.model = model
         self.text_to_insert = text
-        self.insert_location = location
+        # own copies, the model moves its cursor location in place and the command may be replayed later
+        self.insert_location = Location(location.row, location.column)
         self.end_location = None
 
     def execute_do(self):
         self.end_location = self.model._internal_insert_text(self.text_to_insert, self.insert_location)
-        self.model.set_cursor_location(self.end_location)
+        self.model.set_cursor_location(Location(self.end_location.row, self.end_location.column))
         self.model.notify_text_observers()
         self.model.notify_cursor_observers()
 
@@ -19,6 +22,9 @@ class InsertTextAction(EditAction):
         # delete the inserted text
         undo_range = LocationRange(self.insert_location, self.end_location)
         self.model._internal_delete_range(undo_range)
-        self.model.set_cursor_location(self.insert_location)
+        self.model.set_cursor_location(Location(self.insert_location.row, self.insert_location.column))
         self.model.notify_text_observers()
-        self.model.notify_cursor_observers()
\ No newline at end of file
+        self.model.notify_cursor_observers()
+
+    def estimate_size(self):
+        return super().estimate_size() + sys.getsizeof(self.text_to_insert)
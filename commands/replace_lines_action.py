@@ -0,0 +1,54 @@
+import sys
+
+from .edit_action import EditAction
+from position.location import Location
+
+
+class ReplaceLinesAction(EditAction):
+    def __init__(self, model, hunks):
+        # hunks are (start_row, old_lines, new_lines), sorted and given in rows of the current document;
+        # only the changed lines are stored, not the whole document. The line lists are kept as they
+        # are (a sort of a huge document must not be copied again), the caller hands them over
+        self.model = model
+        self.hunks = list(hunks)
+        self.inverse_hunks = []
+        shift = 0
+        for start, old, new in self.hunks:
+            self.inverse_hunks.append((start + shift, new, old))
+            shift += len(new) - len(old)
+
+    def execute_do(self):
+        self._apply(self.hunks)
+
+    def execute_undo(self):
+        self._apply(self.inverse_hunks)
+
+    def _apply(self, hunks):
+        model = self.model
+        with model.suspend_notifications():
+            cursor = self._map_location(model.get_cursor_location(), hunks)
+            for start, old, new in reversed(hunks):  # back to front, so earlier rows stay valid
+                model._internal_replace_lines(start, len(old), new)
+            row = min(cursor.row, len(model.lines) - 1)
+            location = Location(row, min(cursor.column, len(model.lines[row])))
+            model.set_cursor_location(location)
+            model.set_selection_range(Location(row, location.column), Location(row, location.column))
+            model.notify_text_observers()
+            model.notify_cursor_observers()
+
+    @staticmethod
+    def _map_location(location, hunks):
+        # keeps the cursor on the same text: rows below a hunk move with it, rows inside stay inside
+        shift = 0
+        for start, old, new in hunks:
+            if location.row < start:
+                break
+            if location.row < start + len(old):
+                offset = min(location.row - start, max(len(new) - 1, 0))
+                return Location(start + shift + offset, location.column)
+            shift += len(new) - len(old)
+        return Location(max(location.row + shift, 0), location.column)
+
+    def estimate_size(self):
+        return super().estimate_size() + sum(sys.getsizeof(line) for _, old, new in self.hunks
+                                             for lines in (old, new) for line in lines)
@@ -5,7 +5,7 @@ from edit_action import EditAction
 class UpperCaseAction(EditAction):
     def __init__(self, model):
         self.model = model
-        self.previous_text = self.model.get_text()  # save the original text
+        self.previous_snapshot = self.model.snapshot()  # save the original text (shared with the document)
 
     def execute_do(self):
         original_text = self.model.get_text()
@@ -17,6 +17,10 @@ class UpperCaseAction(EditAction):
 
     def execute_undo(self):
         # Vrati dokument na originalno stanje
-        self.model.set_text(self.previous_text)
+        self.model.restore_snapshot(self.previous_snapshot)
         self.model.notify_text_observers()
-        self.model.notify_cursor_observers()
\ No newline at end of file
+        self.model.notify_cursor_observers()
+
+    def estimate_size(self):
+        # the whole original document is kept for undo
+        return super().estimate_size() + self.previous_snapshot.estimated_bytes()
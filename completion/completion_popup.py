@@ -0,0 +1,43 @@
+import tkinter as tk
+
+
+class CompletionPopup(tk.Listbox):
+    # list of suggestions placed on the editor canvas next to the cursor,
+    # the editor forwards the navigation keys while it is open
+    def __init__(self, parent, max_rows=8, **kwargs):
+        super().__init__(parent, height=max_rows, activestyle='none', exportselection=False, **kwargs)
+        self.max_rows = max_rows
+        self.prefix = ''
+        self.bind('<ButtonRelease-1>', lambda e: parent.focus_set())  # typing goes on in the editor
+        self.bind('<Double-Button-1>', lambda e: self.event_generate('<<CompletionAccepted>>'))
+
+    def is_open(self):
+        return bool(self.place_info())
+
+    def show(self, words, prefix, x, y):
+        self.prefix = prefix
+        self.delete(0, 'end')
+        for word in words:
+            self.insert('end', word)
+        self.configure(height=min(len(words), self.max_rows), width=max(len(word) for word in words) + 1)
+        self.select(0)
+        self.place(x=x, y=y)
+
+    def close(self):
+        self.place_forget()
+        self.prefix = ''
+
+    def select(self, index):
+        self.selection_clear(0, 'end')
+        self.selection_set(index)
+        self.activate(index)
+        self.see(index)
+
+    def move_selection(self, step):
+        selection = self.curselection()
+        index = selection[0] if selection else 0
+        self.select(max(0, min(index + step, self.size() - 1)))
+
+    def selected_word(self):
+        selection = self.curselection()
+        return self.get(selection[0]) if selection else None
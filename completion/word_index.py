@@ -0,0 +1,171 @@
+import re
+from bisect import bisect_left, bisect_right, insort
+from heapq import heapify, heappop, heappush, nsmallest
+
+from observers.lines.line_observer import LineObserver
+
+
+WORD_PATTERN = re.compile(r'[^\W\d]\w*')
+MIN_WORD_LENGTH = 3
+BLOCK_SIZE = 256  # distinct words per block of the sorted word array
+PREFIX_PATTERN = re.compile(r'[^\W\d]\w*$')
+REBUILD_LINES = 2000  # larger replacements drop the index, it is rebuilt in one pass on the next lookup
+
+
+def word_before(line, column):
+    # the part of a word that ends at the given column
+    match = PREFIX_PATTERN.search(line, 0, column)
+    return match.group() if match else ''
+
+
+class WordIndex(LineObserver):
+    # word frequencies of the document: the words of every line (parallel to the lines, so an
+    # edit only re-tokenizes the changed lines), a count per word and the distinct words in sorted
+    # blocks for prefix search; every block caches its words ordered by frequency, so the best
+    # matches of a prefix are merged from the blocks it covers instead of ranking all of its words
+    def __init__(self):
+        self.model = None
+        self.line_words = None  # built on the first lookup
+        self.counts = {}
+        self.blocks = [[]]
+        self.block_starts = ['']  # first word of every block
+        self.ranked_blocks = [None]  # words of the block by (-count, word), None until needed
+
+    def attach(self, model):
+        if self.model is not None:
+            self.model.remove_line_observer(self)
+        self.model = model
+        self.invalidate()
+        model.add_line_observer(self)
+
+    def invalidate(self):
+        self.line_words = None
+        self.counts = {}
+        self.blocks = [[]]
+        self.block_starts = ['']
+        self.ranked_blocks = [None]
+
+    @staticmethod
+    def words_of(line):
+        return [word for word in WORD_PATTERN.findall(line) if len(word) >= MIN_WORD_LENGTH]
+
+    def _build(self):
+        self.line_words = [self.words_of(line) for line in self.model.lines]
+        counts = {}
+        for words in self.line_words:
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+        self.counts = counts
+        words = sorted(counts)
+        self.blocks = [words[i:i + BLOCK_SIZE] for i in range(0, len(words), BLOCK_SIZE)] or [[]]
+        self.block_starts = [block[0] if block else '' for block in self.blocks]
+        self.ranked_blocks = [None] * len(self.blocks)
+
+    # --- Sorted blocks ---
+    def _block_of(self, word):
+        return max(bisect_right(self.block_starts, word) - 1, 0)
+
+    def _ranked(self, index):
+        ranked = self.ranked_blocks[index]
+        if ranked is None:
+            counts = self.counts
+            ranked = self.ranked_blocks[index] = sorted(self.blocks[index], key=lambda word: (-counts[word], word))
+        return ranked
+
+    def _insert_word(self, word):
+        index = self._block_of(word)
+        block = self.blocks[index]
+        insort(block, word)
+        self.block_starts[index] = block[0]
+        self.ranked_blocks[index] = None
+        if len(block) > 2 * BLOCK_SIZE:
+            tail = block[BLOCK_SIZE:]
+            del block[BLOCK_SIZE:]
+            self.blocks.insert(index + 1, tail)
+            self.block_starts.insert(index + 1, tail[0])
+            self.ranked_blocks.insert(index + 1, None)
+
+    def _delete_word(self, word):
+        index = self._block_of(word)
+        block = self.blocks[index]
+        del block[bisect_left(block, word)]
+        if not block and len(self.blocks) > 1:
+            del self.blocks[index], self.block_starts[index], self.ranked_blocks[index]
+            return
+        self.block_starts[index] = block[0] if block else ''
+        self.ranked_blocks[index] = None
+
+    def _add(self, words):
+        counts = self.counts
+        for word in words:
+            count = counts.get(word, 0)
+            counts[word] = count + 1
+            if count:
+                self.ranked_blocks[self._block_of(word)] = None
+            else:
+                self._insert_word(word)
+
+    def _remove(self, words):
+        counts = self.counts
+        for word in words:
+            count = counts[word] - 1
+            if count:
+                counts[word] = count
+                self.ranked_blocks[self._block_of(word)] = None
+            else:
+                del counts[word]
+                self._delete_word(word)
+
+    # --- Observer methods ---
+    def update_lines(self, start_row, removed_count, inserted_count):
+        if self.line_words is None:
+            return
+        if removed_count + inserted_count > REBUILD_LINES:
+            # re-counting is cheaper than updating the blocks word by word for whole-document replacements
+            self.invalidate()
+            return
+        for words in self.line_words[start_row:start_row + removed_count]:
+            self._remove(words)
+        new_words = [self.words_of(line) for line in self.model.lines_range(start_row, start_row + inserted_count)]
+        for words in new_words:
+            self._add(words)
+        self.line_words[start_row:start_row + removed_count] = new_words
+
+    # --- Lookup ---
+    def complete(self, prefix, limit=10):
+        # most frequent words starting with prefix; the word being typed itself is not suggested
+        # unless it also appears somewhere else
+        if self.line_words is None:
+            self._build()
+        counts = self.counts
+
+        def wanted(word):
+            return word != prefix or counts[word] > 1
+
+        # blocks that only hold matches are merged by frequency, the (at most two) others are scanned
+        candidates = []
+        heap = []
+        for index in range(self._block_of(prefix), len(self.blocks)):
+            block = self.blocks[index]
+            if not block:
+                continue
+            if block[0] > prefix and not block[0].startswith(prefix):
+                break
+            if block[0].startswith(prefix) and block[-1].startswith(prefix):
+                word = self._ranked(index)[0]
+                heap.append((-counts[word], word, index, 0))
+            else:
+                candidates.extend(word for word in block[bisect_left(block, prefix):]
+                                  if word.startswith(prefix) and wanted(word))
+        heapify(heap)
+        taken = 0
+        while heap and taken < limit:
+            _, word, index, position = heappop(heap)
+            if wanted(word):
+                candidates.append(word)
+                taken += 1
+            ranked = self._ranked(index)
+            if position + 1 < len(ranked):
+                word = ranked[position + 1]
+                heappush(heap, (-counts[word], word, index, position + 1))
+        return nsmallest(limit, candidates, key=lambda word: (-counts[word], word))
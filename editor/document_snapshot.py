@@ -0,0 +1,89 @@
+import sys
+from bisect import bisect_right
+from itertools import islice
+
+from position.location_range import LocationRange
+
+
+class DocumentSnapshot:
+    # immutable view of the document at one point in time, it shares the line chunks
+    # with the live LineBuffer, which copies a chunk before it edits it
+    def __init__(self, chunks, length, size):
+        self._chunks = chunks
+        self._length = length
+        self._size = size  # estimated bytes of the lines (most of them shared with the document)
+        self._starts = None
+
+    @classmethod
+    def of(cls, buffer):
+        return cls(*buffer.freeze())
+
+    def chunks(self):
+        return self._chunks, self._length, self._size
+
+    def estimated_bytes(self):
+        return self._size
+
+    def overhead_bytes(self):
+        # what the snapshot itself costs as long as the document does not change
+        return sys.getsizeof(self._chunks)
+
+    def _locate(self, index):
+        if self._starts is None:
+            starts = []
+            position = 0
+            for chunk in self._chunks:
+                starts.append(position)
+                position += len(chunk)
+            self._starts = starts
+        chunk_index = bisect_right(self._starts, index) - 1
+        while len(self._chunks[chunk_index]) <= index - self._starts[chunk_index]:
+            chunk_index += 1
+        return chunk_index, index - self._starts[chunk_index]
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def line(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('line index out of range')
+        chunk_index, offset = self._locate(index)
+        return self._chunks[chunk_index][offset]
+
+    __getitem__ = line
+
+    def all_lines(self):
+        return iter(self)
+
+    def lines_range(self, index1, index2):
+        if index1 < 0 or index2 > self._length:
+            raise IndexError('Index out of range')
+        if index1 >= index2:
+            return
+        chunk_index, offset = self._locate(index1)
+        yield from islice(self._iter_from(chunk_index, offset), index2 - index1)
+
+    def _iter_from(self, chunk_index, offset):
+        yield from islice(self._chunks[chunk_index], offset, None)
+        for chunk in islice(self._chunks, chunk_index + 1, None):
+            yield from chunk
+
+    def get_text(self):
+        return '\n'.join(self)
+
+    def get_text_from_range(self, loc_range: LocationRange):
+        if loc_range.is_empty():
+            return ''
+        start, end = loc_range.start, loc_range.end
+        if start.row == end.row:
+            return self.line(start.row)[start.column:end.column]
+        lines = list(self.lines_range(start.row, end.row + 1))
+        lines[0] = lines[0][start.column:]
+        lines[-1] = lines[-1][:end.column]
+        return '\n'.join(lines)
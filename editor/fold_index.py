@@ -0,0 +1,411 @@
+import re
+from bisect import bisect_left, bisect_right
+
+from observers.lines.line_observer import LineObserver
+
+
+BLOCK_SIZE = 256  # lines per block of summaries, blocks are split at twice this size
+BRACKETS = {'(': (0, 1), ')': (0, -1), '[': (1, 1), ']': (1, -1), '{': (2, 1), '}': (2, -1)}
+OPENING = '([{'
+CLOSING = ')]}'
+BRACKET_PATTERN = re.compile(r'[()\[\]{}]')
+NO_BRACKETS = (0, 0, 0, 0, 0, 0)
+
+
+def summarize(line):
+    # (indent, then depth change and lowest depth for each bracket kind), a blank line has no indent
+    stripped = line.lstrip()
+    indent = len(line) - len(stripped) if stripped else None
+    brackets = BRACKET_PATTERN.findall(line)
+    if not brackets:
+        return (indent,) + NO_BRACKETS
+    depth = [0, 0, 0]
+    lowest = [0, 0, 0]
+    for bracket in brackets:
+        kind, step = BRACKETS[bracket]
+        depth[kind] += step
+        if depth[kind] < lowest[kind]:
+            lowest[kind] = depth[kind]
+    return (indent, depth[0], lowest[0], depth[1], lowest[1], depth[2], lowest[2])
+
+
+def combine(summaries):
+    # summary of consecutive lines, in the same format as the summary of one line
+    indents = [summary[0] for summary in summaries if summary[0] is not None]
+    result = [min(indents) if indents else None]
+    for kind in range(3):
+        delta_index = 1 + 2 * kind
+        depth = lowest = 0
+        for summary in summaries:
+            if depth + summary[delta_index + 1] < lowest:
+                lowest = depth + summary[delta_index + 1]
+            depth += summary[delta_index]
+        result += (depth, lowest)
+    return tuple(result)
+
+
+class FoldIndex(LineObserver):
+    # folded (hidden) regions of the document and the line summaries used to find regions and bracket pairs;
+    # the summaries are kept in blocks with a combined summary each, so a search skips whole blocks
+    def __init__(self, model):
+        self.model = model
+        self.blocks = None  # built on the first search
+        self.block_summaries = None
+        self._starts = None
+        # folded regions, sorted and disjoint (first and last hidden row)
+        self.fold_starts = []
+        self.fold_ends = []
+        self._hidden_before = [0]  # hidden rows in the first i folds
+        self._display_starts = []  # display row right after the header of every fold
+
+    # --- Observer methods ---
+    def update_lines(self, start_row, removed_count, inserted_count):
+        if self.blocks is not None:
+            inserted = [summarize(line) for line in self.model.lines_range(start_row, start_row + inserted_count)]
+            self._replace(start_row, start_row + removed_count, inserted)
+        # folds touched by the edit are opened, the ones below it move, the ones above it stay as they are
+        index = bisect_left(self.fold_ends, start_row)
+        if index == len(self.fold_starts):
+            return
+        touched_stop = bisect_right(self.fold_starts, start_row + removed_count - 1, index)
+        if touched_stop > index:
+            self._set_folds(self._folds_from(touched_stop), index)
+        shift = inserted_count - removed_count
+        if shift:
+            self.fold_starts[index:] = [start + shift for start in self.fold_starts[index:]]
+            self.fold_ends[index:] = [end + shift for end in self.fold_ends[index:]]
+            self._display_starts[index:] = [start + shift for start in self._display_starts[index:]]
+
+    # --- Line summaries ---
+    def _ensure_built(self):
+        if self.blocks is None:
+            summaries = [summarize(line) for line in self.model.lines]
+            self.blocks = [summaries[i:i + BLOCK_SIZE] for i in range(0, len(summaries), BLOCK_SIZE)] or [[]]
+            self.block_summaries = [combine(block) for block in self.blocks]
+            self._starts = None
+
+    def _block_starts(self):
+        if self._starts is None:
+            starts = []
+            position = 0
+            for block in self.blocks:
+                starts.append(position)
+                position += len(block)
+            self._starts = starts
+        return self._starts
+
+    def _locate(self, row):
+        starts = self._block_starts()
+        block_index = bisect_right(starts, row) - 1
+        return block_index, row - starts[block_index]
+
+    def _summary(self, row):
+        block_index, offset = self._locate(row)
+        return self.blocks[block_index][offset]
+
+    def _replace(self, start, stop, summaries):
+        # only the blocks holding the replaced rows are rebuilt
+        starts = self._block_starts()
+        first = bisect_right(starts, start) - 1
+        last = max(bisect_right(starts, stop - 1) - 1, first)
+        merged = [summary for block in self.blocks[first:last + 1] for summary in block]
+        offset = starts[first]
+        merged[start - offset:stop - offset] = summaries
+        if len(merged) > 2 * BLOCK_SIZE:
+            new_blocks = [merged[i:i + BLOCK_SIZE] for i in range(0, len(merged), BLOCK_SIZE)]
+        elif merged or len(self.blocks) == last - first + 1:
+            new_blocks = [merged]
+        else:
+            new_blocks = []
+        self.blocks[first:last + 1] = new_blocks
+        self.block_summaries[first:last + 1] = [combine(block) for block in new_blocks]
+        self._starts = None
+
+    def _find_forward(self, row, test, skip):
+        # first row from row on for which test(summary) is true, skip(block summary) tells when a block
+        # cannot contain such a row; test and skip may keep state (bracket depth) between calls
+        self._ensure_built()
+        block_index, offset = self._locate(row)
+        starts = self._block_starts()
+        while block_index < len(self.blocks):
+            if offset or not skip(self.block_summaries[block_index]):
+                block = self.blocks[block_index]
+                for i in range(offset, len(block)):
+                    if test(block[i]):
+                        return starts[block_index] + i
+            block_index += 1
+            offset = 0
+        return None
+
+    def _find_backward(self, row, test, skip):
+        # last row at or before row for which test(summary) is true
+        self._ensure_built()
+        block_index, offset = self._locate(row)
+        starts = self._block_starts()
+        while block_index >= 0:
+            block = self.blocks[block_index]
+            if offset < len(block) - 1 or not skip(self.block_summaries[block_index]):
+                for i in range(offset, -1, -1):
+                    if test(block[i]):
+                        return starts[block_index] + i
+            block_index -= 1
+            if block_index >= 0:
+                offset = len(self.blocks[block_index]) - 1
+        return None
+
+    # --- Bracket matching ---
+    def match_bracket(self, row, column):
+        # (row, column) of the bracket that pairs with the one at the given location, or None
+        line = self.model.lines[row]
+        if column >= len(line) or line[column] not in BRACKETS:
+            return None
+        kind, step = BRACKETS[line[column]]
+        if step > 0:
+            return self._match_forward(row, column, kind)
+        return self._match_backward(row, column, kind)
+
+    def _match_forward(self, row, column, kind):
+        opening, closing = OPENING[kind], CLOSING[kind]
+        delta_index = 1 + 2 * kind
+        depth = 1
+        line = self.model.lines[row]
+        for i in range(column + 1, len(line)):
+            depth += (line[i] == opening) - (line[i] == closing)
+            if not depth:
+                return row, i
+        if row + 1 >= len(self.model.lines):
+            return None
+
+        state = [depth]
+
+        def reaches_zero(summary):
+            if state[0] + summary[delta_index + 1] <= 0:
+                return True
+            state[0] += summary[delta_index]
+            return False
+
+        def skip(block_summary):
+            if state[0] + block_summary[delta_index + 1] <= 0:
+                return False
+            state[0] += block_summary[delta_index]
+            return True
+
+        match_row = self._find_forward(row + 1, reaches_zero, skip)
+        if match_row is None:
+            return None
+        depth = state[0]
+        line = self.model.lines[match_row]
+        for i, char in enumerate(line):
+            depth += (char == opening) - (char == closing)
+            if not depth:
+                return match_row, i
+        return None
+
+    def _match_backward(self, row, column, kind):
+        opening, closing = OPENING[kind], CLOSING[kind]
+        delta_index = 1 + 2 * kind
+        depth = 1
+        line = self.model.lines[row]
+        for i in range(column - 1, -1, -1):
+            depth += (line[i] == closing) - (line[i] == opening)
+            if not depth:
+                return row, i
+        if row == 0:
+            return None
+
+        # walking backwards over a line lowers the depth by its delta, its lowest point is lowest - delta
+        state = [depth]
+
+        def reaches_zero(summary):
+            if state[0] + summary[delta_index + 1] - summary[delta_index] <= 0:
+                return True
+            state[0] -= summary[delta_index]
+            return False
+
+        def skip(block_summary):
+            if state[0] + block_summary[delta_index + 1] - block_summary[delta_index] <= 0:
+                return False
+            state[0] -= block_summary[delta_index]
+            return True
+
+        match_row = self._find_backward(row - 1, reaches_zero, skip)
+        if match_row is None:
+            return None
+        depth = state[0]
+        line = self.model.lines[match_row]
+        for i in range(len(line) - 1, -1, -1):
+            depth += (line[i] == closing) - (line[i] == opening)
+            if not depth:
+                return match_row, i
+        return None
+
+    # --- Fold regions ---
+    def _indent(self, row):
+        return self._summary(row)[0]
+
+    def _next_indent_at_most(self, row, limit):
+        # first non-blank row from row on that is indented at most limit
+        return self._find_forward(row,
+                                  lambda summary: summary[0] is not None and summary[0] <= limit,
+                                  lambda block: block[0] is None or block[0] > limit)
+
+    def _previous_indent_below(self, row, limit):
+        # last non-blank row at or before row that is indented less than limit
+        return self._find_backward(row,
+                                   lambda summary: summary[0] is not None and summary[0] < limit,
+                                   lambda block: block[0] is None or block[0] >= limit)
+
+    def region_at(self, row):
+        # (first, last) row hidden when the given row is folded, None if the row does not start a region;
+        # an unclosed bracket at the end of the row wins over indentation
+        self._ensure_built()
+        line = self.model.lines[row]
+        unclosed = []
+        for match in BRACKET_PATTERN.finditer(line):
+            kind, step = BRACKETS[match.group()]
+            if step > 0:
+                unclosed.append((kind, match.start()))
+            elif unclosed and unclosed[-1][0] == kind:
+                unclosed.pop()
+        if unclosed:
+            kind, column = unclosed[-1]
+            match = self._match_forward(row, column, kind)
+            if match is not None and match[0] - 1 > row:
+                return row + 1, match[0] - 1  # the closing line stays visible
+
+        indent = self._indent(row)
+        if indent is None or row + 1 >= len(self.model.lines):
+            return None
+        next_row = self._next_indent_at_most(row + 1, indent)
+        last = (next_row if next_row is not None else len(self.model.lines)) - 1
+        while last > row and self._indent(last) is None:
+            last -= 1
+        return (row + 1, last) if last > row else None
+
+    def enclosing_region(self, row):
+        # the region that the row is the header of or that contains it
+        self._ensure_built()
+        header = row
+        while header is not None:
+            region = self.region_at(header)
+            if region is not None and region[1] >= row:
+                return region
+            indent = self._indent(header)
+            if indent is None:
+                header = self._find_backward(header, lambda summary: summary[0] is not None, lambda block: block[0] is None)
+            elif indent == 0 or header == 0:
+                return None
+            else:
+                header = self._previous_indent_below(header - 1, indent)
+        return None
+
+    # --- Folds ---
+    def _set_folds(self, folds, index=0):
+        # replaces the folds from index on, only their running totals are recomputed
+        del self.fold_starts[index:], self.fold_ends[index:], self._hidden_before[index + 1:], self._display_starts[index:]
+        hidden = self._hidden_before[index]
+        for start, end in folds:
+            self.fold_starts.append(start)
+            self.fold_ends.append(end)
+            self._display_starts.append(start - hidden)
+            hidden += end - start + 1
+            self._hidden_before.append(hidden)
+
+    def folds(self):
+        return self._folds_from(0)
+
+    def _folds_from(self, index):
+        return list(zip(self.fold_starts[index:], self.fold_ends[index:]))
+
+    def fold(self, first, last):
+        # hides rows first..last, folds that overlap or touch them are merged into the new one
+        index = bisect_left(self.fold_ends, first - 1)
+        stop = bisect_right(self.fold_starts, last + 1)
+        if index < stop:
+            first = min(first, self.fold_starts[index])
+            last = max(last, self.fold_ends[stop - 1])
+        self._set_folds([(first, last)] + self._folds_from(stop), index)
+
+    def fold_at(self, row):
+        region = self.enclosing_region(row)
+        if region is None:
+            return None
+        self.fold(*region)
+        return region
+
+    def unfold(self, row):
+        # opens the fold that hides the row or whose header it is
+        for fold_row in (row, row + 1):
+            index = self._fold_containing(fold_row)
+            if index is not None:
+                self._set_folds(self._folds_from(index + 1), index)
+                return True
+        return False
+
+    def unfold_all(self):
+        self._set_folds([])
+
+    def has_folds(self):
+        return bool(self.fold_starts)
+
+    def is_header(self, row):
+        index = self._fold_containing(row + 1)
+        return index is not None and self.fold_starts[index] == row + 1
+
+    # --- Visible rows ---
+    def _fold_containing(self, row):
+        index = bisect_right(self.fold_starts, row) - 1
+        if index >= 0 and row <= self.fold_ends[index]:
+            return index
+        return None
+
+    def is_hidden(self, row):
+        return self._fold_containing(row) is not None
+
+    def next_visible(self, row):
+        # the row itself if it is visible, otherwise the first visible row after its fold
+        index = self._fold_containing(row)
+        while index is not None:
+            row = self.fold_ends[index] + 1
+            index = self._fold_containing(row)
+        return row
+
+    def previous_visible(self, row):
+        index = self._fold_containing(row)
+        while index is not None:
+            row = self.fold_starts[index] - 1
+            index = self._fold_containing(row)
+        return row
+
+    def visible_count(self):
+        return len(self.model.lines) - self._hidden_before[-1]
+
+    def display_row(self, row):
+        # position of a visible row among the visible rows
+        index = bisect_right(self.fold_starts, row)
+        return row - self._hidden_before[index]
+
+    def row_at_display(self, display_row):
+        index = bisect_right(self._display_starts, display_row)
+        return display_row + self._hidden_before[index]
+
+    def advance(self, row, count):
+        # the visible row count rows below (or above, for negative counts) the given one
+        display_row = max(0, min(self.display_row(self.previous_visible(row)) + count, self.visible_count() - 1))
+        return self.row_at_display(display_row)
+
+    def visible_runs(self, first_row, count):
+        # (start, stop) ranges of consecutive visible rows, count rows in total starting at first_row
+        line_count = len(self.model.lines)
+        row = self.next_visible(first_row)
+        index = bisect_right(self.fold_starts, row)
+        while count > 0 and row < line_count:
+            stop = self.fold_starts[index] if index < len(self.fold_starts) else line_count
+            stop = min(stop, row + count)
+            yield row, stop
+            count -= stop - row
+            if index < len(self.fold_starts) and stop == self.fold_starts[index]:
+                row = self.fold_ends[index] + 1
+                index += 1
+            else:
+                row = stop
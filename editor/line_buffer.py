@@ -0,0 +1,202 @@
+import sys
+from bisect import bisect_right
+from itertools import islice
+
+
+CHUNK_SIZE = 512  # lines per chunk, chunks are split at twice this size
+POINTER_SIZE = 8  # a line also costs its slot in the chunk list
+
+
+def line_size(line):
+    return sys.getsizeof(line) + POINTER_SIZE
+
+
+class LineBuffer:
+    # list-like container of the document lines, stored in chunks so that snapshots can share them;
+    # a chunk that is shared with a snapshot is copied the first time it is modified (copy-on-write)
+    def __init__(self, lines=()):
+        lines = list(lines)
+        self._chunks = [lines[i:i + CHUNK_SIZE] for i in range(0, len(lines), CHUNK_SIZE)] or [[]]
+        self._owned = {id(chunk) for chunk in self._chunks}  # chunks not shared with any snapshot
+        self._length = len(lines)
+        self._starts = None  # index of the first line of every chunk, rebuilt after structural changes
+        self._bytes = sum(map(line_size, lines))  # kept up to date by every edit
+
+    @classmethod
+    def from_chunks(cls, chunks, length, size):
+        # builds a buffer sharing the chunks of a snapshot, nothing is copied until it is edited
+        buffer = cls()
+        buffer._chunks = list(chunks) or [[]]
+        buffer._owned = set()
+        buffer._length = length
+        buffer._bytes = size
+        return buffer
+
+    def freeze(self):
+        # hands out the current chunks, from now on they are treated as shared
+        self._owned.clear()
+        return tuple(self._chunks), self._length, self._bytes
+
+    def estimated_bytes(self):
+        # approximate memory of the lines, maintained incrementally
+        return self._bytes
+
+    # --- Internal helpers ---
+    def _chunk_starts(self):
+        if self._starts is None:
+            starts = []
+            position = 0
+            for chunk in self._chunks:
+                starts.append(position)
+                position += len(chunk)
+            self._starts = starts
+        return self._starts
+
+    def _normalize(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('line index out of range')
+        return index
+
+    def _locate(self, index):
+        starts = self._chunk_starts()
+        chunk_index = bisect_right(starts, index) - 1
+        # skip empty chunks that share the same start
+        while len(self._chunks[chunk_index]) <= index - starts[chunk_index]:
+            chunk_index += 1
+        return chunk_index, index - starts[chunk_index]
+
+    def _writable(self, chunk_index):
+        chunk = self._chunks[chunk_index]
+        if id(chunk) not in self._owned:
+            chunk = list(chunk)
+            self._chunks[chunk_index] = chunk
+            self._owned.add(id(chunk))
+        return chunk
+
+    def _structure_changed(self):
+        self._starts = None
+        if len(self._chunks) > 1 and not all(self._chunks):
+            self._chunks = [chunk for chunk in self._chunks if chunk] or [[]]
+
+    # --- List interface ---
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return list(self)[index]
+            return list(self.iter_range(start, stop))
+        chunk_index, offset = self._locate(self._normalize(index))
+        return self._chunks[chunk_index][offset]
+
+    def __setitem__(self, index, line):
+        chunk_index, offset = self._locate(self._normalize(index))
+        chunk = self._writable(chunk_index)
+        self._bytes += line_size(line) - line_size(chunk[offset])
+        chunk[offset] = line
+
+    def __delitem__(self, index):
+        if not isinstance(index, slice):
+            index = self._normalize(index)
+            index = slice(index, index + 1)
+        start, stop, step = index.indices(self._length)
+        if step != 1:
+            raise ValueError('LineBuffer only supports contiguous deletes')
+        if start >= stop:
+            return
+
+        chunk_index, offset = self._locate(start)
+        remaining = stop - start
+        while remaining:
+            chunk = self._chunks[chunk_index]
+            if offset == 0 and len(chunk) <= remaining:
+                # the whole chunk goes away, no need to copy it
+                remaining -= len(chunk)
+                self._bytes -= sum(map(line_size, chunk))
+                self._chunks[chunk_index] = []
+            else:
+                count = min(remaining, len(chunk) - offset)
+                self._bytes -= sum(map(line_size, islice(chunk, offset, offset + count)))
+                del self._writable(chunk_index)[offset:offset + count]
+                remaining -= count
+            chunk_index += 1
+            offset = 0
+        self._length -= stop - start
+        self._structure_changed()
+
+    def insert(self, index, line):
+        if index < 0:
+            index = max(index + self._length, 0)
+        if index >= self._length:
+            chunk_index = len(self._chunks) - 1
+            offset = len(self._chunks[chunk_index])
+        else:
+            chunk_index, offset = self._locate(index)
+        chunk = self._writable(chunk_index)
+        chunk.insert(offset, line)
+        self._length += 1
+        self._bytes += line_size(line)
+        if len(chunk) > 2 * CHUNK_SIZE:
+            self._split(chunk_index)
+        self._starts = None
+
+    def append(self, line):
+        self.insert(self._length, line)
+
+    def extend(self, lines):
+        self.replace(self._length, self._length, lines)
+
+    def replace(self, start, stop, lines):
+        # replaces lines[start:stop] with the given lines, new lines are stored in fresh chunks
+        if not isinstance(lines, list):
+            lines = list(lines)  # a list is only sliced into chunks, not copied first
+        del self[start:stop]
+        if not lines:
+            return
+        if start >= self._length:
+            chunk_index = len(self._chunks)
+        else:
+            chunk_index, offset = self._locate(start)
+            if offset:
+                # split the chunk so the new lines can go in between
+                chunk = self._writable(chunk_index)
+                tail = chunk[offset:]
+                del chunk[offset:]
+                self._chunks.insert(chunk_index + 1, tail)
+                self._owned.add(id(tail))
+                chunk_index += 1
+        new_chunks = [lines[i:i + CHUNK_SIZE] for i in range(0, len(lines), CHUNK_SIZE)]
+        self._chunks[chunk_index:chunk_index] = new_chunks
+        self._owned.update(id(chunk) for chunk in new_chunks)
+        self._length += len(lines)
+        self._bytes += sum(map(line_size, lines))
+        self._structure_changed()
+
+    def _split(self, chunk_index):
+        chunk = self._chunks[chunk_index]
+        tail = chunk[CHUNK_SIZE:]
+        del chunk[CHUNK_SIZE:]
+        self._chunks.insert(chunk_index + 1, tail)
+        self._owned.add(id(tail))
+
+    def iter_range(self, start, stop):
+        if start >= stop:
+            return
+        chunk_index, offset = self._locate(start)
+        yield from islice(self._iter_from(chunk_index, offset), stop - start)
+
+    def _iter_from(self, chunk_index, offset):
+        yield from islice(self._chunks[chunk_index], offset, None)
+        for chunk in islice(self._chunks, chunk_index + 1, None):
+            yield from chunk
+
+    def __repr__(self):
+        return f'LineBuffer({list(self)!r})'
@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, simpledialog
 import sys
 import os
 
@@ -19,10 +19,16 @@ from observers.clipboard.clipboard_observer import ClipboardObserver
 from stack.undo_manager import UndoManager
 from observers.stack.undo_manager_observer import UndoManagerObserver
 from commands.delete_action import DeleteAction
+from spellcheck.spell_checker import SpellChecker
+from completion.word_index import WordIndex, word_before
+from completion.completion_popup import CompletionPopup
+from editor.fold_index import BRACKETS
+from minimap.minimap_canvas import Minimap
 
 
 class TextEditor(tk.Frame, CursorObserver, TextObserver):
-    def __init__(self, parent, model: TextEditorModel, clipboard: ClipboardStack, undo_manager: UndoManager, *args, **kwargs):
+    def __init__(self, parent, model: TextEditorModel, clipboard: ClipboardStack, undo_manager: UndoManager,
+                 spell_dictionary=None, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         
         self.model = model
@@ -40,14 +46,57 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
         self.char_width = 8  # approx. width of character
         self.padding = 5
         self.selection_color = '#d2e4ff'
+        self.bracket_color = '#888888'
+        self.fold_marker_color = 'gray'
+        self.render_item_count = 0  # canvas items created by the last redraw
+        self.squiggle_color = 'red'
+        self.first_visible_row = 0
+        self.scroll_step = 3
+
+        # spell checking is only available when a word list was found
+        self.spell_checker = SpellChecker(spell_dictionary) if spell_dictionary is not None else None
+        self.spell_check_job = None
+        self.spell_check_delay = 100  # ms of idle time before the rest of the document is checked
+        if self.spell_checker is not None:
+            self.spell_checker.attach(self.model)
+
+        # overview of the whole document on the right
+        self.minimap = Minimap(self, self)
+        self.minimap.pack(side='right', fill='y')
+        self.minimap.attach(self.model)
+        self.search_text = ''
 
         self.canvas = tk.Canvas(self, bg='white', highlightthickness=0)
-        self.canvas.pack(fill='both', expand=True)
+        self.canvas.pack(side='left', fill='both', expand=True)
+
+        # word completion from the words already in the document
+        self.word_index = WordIndex()
+        self.word_index.attach(self.model)
+        self.completion_popup = CompletionPopup(self.canvas, font=(self.font_family, self.font_size - 2))
+        self.completion_popup.bind('<<CompletionAccepted>>', self.accept_completion)
 
         self.bind_keys()
         self.canvas.focus_set()
         self.redraw()
 
+    def set_model(self, model: TextEditorModel, undo_manager: UndoManager):
+        # switches the editor to another document of the workspace
+        self.model.remove_cursor_observer(self)
+        self.model.remove_text_observer(self)
+        self.model = model
+        self.undo_manager = undo_manager
+        self.model.add_cursor_observer(self)
+        self.model.add_text_observer(self)
+        self.selection_anchor = None
+        self.first_visible_row = 0
+        if self.spell_checker is not None:
+            self.spell_checker.attach(self.model)
+        self.word_index.attach(self.model)
+        self.completion_popup.close()
+        self.minimap.attach(self.model)
+        self.minimap.set_search_text(self.search_text)
+        self.redraw()
+
     def bind_keys(self):
         modifier = 'Command' if sys.platform == 'darwin' else 'Control'  # Mac uses Command, others use Control
         
@@ -68,6 +117,7 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
         self.canvas.bind('<Key>', self.handle_key_press)
         self.canvas.bind('<Return>', self.handle_key_press)
         self.canvas.bind('<BackSpace>', lambda e: self.model.delete_before())
+        self.canvas.bind(f'<{modifier}-space>', self.show_completions)
         self.canvas.bind('<Delete>', lambda e: self.model.delete_after())
         
         # --- Clipboard operations ---
@@ -81,8 +131,23 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
         self.canvas.bind(f'<{modifier}-y>', lambda e: self.undo_manager.redo())
         self.canvas.bind(f'<{modifier}-Shift-Z>', lambda e: self.undo_manager.redo())
 
+        # --- Folding ---
+        self.canvas.bind(f'<{modifier}-bracketleft>', self.fold_at_cursor)
+        self.canvas.bind(f'<{modifier}-bracketright>', self.unfold_at_cursor)
+        self.canvas.bind(f'<{modifier}-m>', self.goto_matching_bracket)
+
+        # --- Search ---
+        self.canvas.bind(f'<{modifier}-f>', self.ask_find)
+        self.canvas.bind('<F3>', self.find_next)
+
+        # --- Scrolling ---
+        self.canvas.bind('<MouseWheel>', self.handle_mouse_wheel)
+        self.canvas.bind('<Button-4>', self.handle_mouse_wheel)
+        self.canvas.bind('<Button-5>', self.handle_mouse_wheel)
+        self.canvas.bind('<Configure>', lambda e: self.redraw(follow_cursor=False))
+
         # --- Close the application ---
-        self.canvas.bind('<Escape>', lambda e: self.master.quit())
+        self.canvas.bind('<Escape>', self.handle_escape)
         
 
     # --- Event handlers for clipboard operations ---
@@ -111,6 +176,11 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
             self.model.insert(self.clipboard.pop())
 
     def handle_regular_movement(self, event):
+        if self.completion_popup.is_open():
+            if event.keysym in ('Up', 'Down'):
+                self.completion_popup.move_selection(-1 if event.keysym == 'Up' else 1)
+                return 'break'
+            self.completion_popup.close()
         self.selection_anchor = None
         if event.keysym == 'Up': self.model.move_cursor_up()
         elif event.keysym == 'Down': self.model.move_cursor_down()
@@ -126,6 +196,8 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
         self.model.set_selection_range(start=self.selection_anchor, end=new_location)
 
     def handle_key_press(self, event):
+        if self.completion_popup.is_open() and event.keysym in ('Return', 'Tab'):
+            return self.accept_completion()
         self.selection_anchor = None
         if event.keysym in ('Shift_L', 'Shift_R', 'Control_L', 'Control_R', 'Alt_L', 'Alt_R', 'Caps_Lock', 'Tab', 'Meta_L', 'Meta_R'):
             return
@@ -133,13 +205,161 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
         if char_to_insert:
             self.model.insert(char_to_insert)
 
-    def redraw(self, cursor_location=None):
+    def handle_escape(self, event=None):
+        if self.completion_popup.is_open():
+            self.completion_popup.close()
+        else:
+            self.master.quit()
+
+    # --- Word completion ---
+    def show_completions(self, event=None):
+        cursor = self.model.get_cursor_location()
+        prefix = word_before(self.model.lines[cursor.row], cursor.column)
+        words = self.word_index.complete(prefix) if prefix else []
+        if not words:
+            self.completion_popup.close()
+            return 'break'
+        # the list opens below the start of the word
+        x = self.padding + (cursor.column - len(prefix)) * self.char_width
+        folds = self.model.folds
+        y = (folds.display_row(cursor.row) - folds.display_row(self.first_visible_row) + 1) * self.line_height + self.padding
+        self.completion_popup.show(words, prefix, x, y)
+        return 'break'
+
+    def accept_completion(self, event=None):
+        word = self.completion_popup.selected_word()
+        prefix = self.completion_popup.prefix
+        self.completion_popup.close()
+        if word is not None and len(word) > len(prefix):
+            self.model.insert(word[len(prefix):])
+        self.canvas.focus_set()
+        return 'break'
+
+    # --- Folding ---
+    def fold_at_cursor(self, event=None):
+        cursor = self.model.get_cursor_location()
+        folds = self.model.folds
+        if folds.fold_at(cursor.row) is not None and folds.is_hidden(cursor.row):
+            # the cursor moves to the end of the folded header line
+            header = folds.previous_visible(cursor.row)
+            location = Location(header, len(self.model.lines[header]))
+            self.model.set_cursor_location(location)
+            self.model.set_selection_range(location, location)
+        self.redraw(follow_cursor=False)
+        return 'break'
+
+    def unfold_at_cursor(self, event=None):
+        self.model.folds.unfold(self.model.get_cursor_location().row)
+        self.redraw(follow_cursor=False)
+        return 'break'
+
+    def unfold_all(self):
+        self.model.folds.unfold_all()
+        self.redraw(follow_cursor=False)
+
+    def bracket_pair(self, location):
+        # the bracket next to the cursor and the one it pairs with, empty if there is none
+        line = self.model.lines[location.row]
+        for column in (location.column, location.column - 1):
+            if 0 <= column < len(line) and line[column] in BRACKETS:
+                match = self.model.folds.match_bracket(location.row, column)
+                if match is not None:
+                    return [(location.row, column), match]
+        return []
+
+    def goto_matching_bracket(self, event=None):
+        pair = self.bracket_pair(self.model.get_cursor_location())
+        if pair:
+            location = Location(*pair[1])
+            self.selection_anchor = None
+            self.model.set_selection_range(location, location)
+            self.model.set_cursor_location(location)
+        return 'break'
+
+    # --- Search ---
+    def ask_find(self, event=None):
+        text = simpledialog.askstring('Find', 'Find:', initialvalue=self.search_text, parent=self)
+        self.canvas.focus_set()
+        if text is not None:
+            self.find(text)
+        return 'break'
+
+    def find(self, text):
+        # the lines containing the text are marked on the minimap
+        self.search_text = text
+        self.minimap.set_search_text(text)
+        self.find_next()
+
+    def find_next(self, event=None):
+        # selects the next occurrence after the cursor, wrapping around at the end of the document
+        if not self.search_text:
+            return 'break'
+        cursor = self.model.get_cursor_location()
+        row, column = cursor.row, self.model.lines[cursor.row].find(self.search_text, cursor.column)
+        if column < 0:
+            row = self.minimap.next_hit_row(cursor.row + 1)
+            if row is None:
+                return 'break'
+            column = self.model.lines[row].find(self.search_text)
+        start = Location(row, column)
+        end = Location(row, column + len(self.search_text))
+        self.selection_anchor = None
+        self.model.set_cursor_location(end)
+        self.model.set_selection_range(start, end)
+        return 'break'
+
+    # --- Viewport ---
+    def visible_row_count(self):
+        height = self.canvas.winfo_height()
+        if height <= 1:  # not mapped yet
+            height = self.canvas.winfo_reqheight()
+        return max(1, (height - self.padding) // self.line_height)
+
+    def scroll_to(self, first_row):
+        # rows are counted without the folded ones
+        folds = self.model.folds
+        last_first_row = folds.row_at_display(max(folds.visible_count() - self.visible_row_count(), 0))
+        self.first_visible_row = max(0, min(folds.next_visible(max(first_row, 0)), last_first_row))
+        self.completion_popup.close()
+        self.redraw(follow_cursor=False)
+
+    def handle_mouse_wheel(self, event):
+        step = -self.scroll_step if event.num == 4 or event.delta > 0 else self.scroll_step
+        self.scroll_to(self.model.folds.advance(self.first_visible_row, step))
+
+    def ensure_visible(self, row):
+        folds = self.model.folds
+        if folds.is_hidden(row):
+            folds.unfold(row)  # the cursor was moved into a folded region
+        visible_rows = self.visible_row_count()
+        first_row = folds.previous_visible(max(0, min(self.first_visible_row, len(self.model.lines) - 1)))
+        if row < first_row:
+            first_row = row
+        elif folds.display_row(row) >= folds.display_row(first_row) + visible_rows:
+            first_row = folds.row_at_display(folds.display_row(row) - visible_rows + 1)
+        self.first_visible_row = first_row
+
+    def visible_lines(self, first_row, count):
+        # (row, line) of the rows on screen, folded rows are left out
+        for start, stop in self.model.folds.visible_runs(first_row, count):
+            yield from enumerate(self.model.lines_range(start, stop), start)
+
+    def redraw(self, cursor_location=None, follow_cursor=True):
         if cursor_location is None: cursor_location = self.model.get_cursor_location()
+        if follow_cursor:
+            self.ensure_visible(cursor_location.row)
         self.canvas.delete('all')
         selection = self.model.get_selection_range()
+        item_count = 1  # the cursor
 
-        for i, line in enumerate(self.model.all_lines()):
-            y_pos = i * self.line_height + self.padding
+        # only the rows inside the viewport are drawn
+        folds = self.model.folds
+        first_row = folds.previous_visible(min(self.first_visible_row, len(self.model.lines) - 1))
+        brackets = self.bracket_pair(cursor_location)
+        last_row = first_row
+        for screen_row, (i, line) in enumerate(self.visible_lines(first_row, self.visible_row_count() + 1)):
+            last_row = i
+            y_pos = screen_row * self.line_height + self.padding
 
             if not selection.is_empty() and selection.start.row <= i <= selection.end.row:
                 start_col = selection.start.column if i == selection.start.row else 0
@@ -152,6 +372,14 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
                                              fill=self.selection_color, 
                                              outline=''
                                              )
+                item_count += 1
+            # outline matching brackets
+            for row, column in brackets:
+                if row == i:
+                    x_pos = self.padding + column * self.char_width
+                    self.canvas.create_rectangle(x_pos, y_pos, x_pos + self.char_width, y_pos + self.line_height,
+                                                 outline=self.bracket_color)
+                    item_count += 1
             # draw text
             self.canvas.create_text(self.padding, 
                                     y_pos, 
@@ -160,11 +388,51 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
                                     font=(self.font_family, self.font_size), 
                                     fill='black'
                                     )
+            item_count += 1
+            # the rows hidden below a folded line are shown as a marker after it
+            if folds.is_header(i):
+                self.canvas.create_text(self.padding + (len(line) + 1) * self.char_width,
+                                        y_pos,
+                                        text='...',
+                                        anchor='nw',
+                                        font=(self.font_family, self.font_size),
+                                        fill=self.fold_marker_color
+                                        )
+                item_count += 1
+            # draw spelling squiggles
+            if self.spell_checker is not None:
+                for start_col, end_col in self.spell_checker.misspellings(i):
+                    self.draw_squiggle(start_col, end_col, y_pos + self.line_height - 2)
+                    item_count += 1
         # draw cursor
-        cursor_x = self.padding + cursor_location.column * self.char_width
-        cursor_y_start = cursor_location.row * self.line_height + self.padding
-        cursor_y_end = cursor_y_start + self.line_height
-        self.canvas.create_line(cursor_x, cursor_y_start, cursor_x, cursor_y_end, fill='blue', width=2)
+        if not folds.is_hidden(cursor_location.row):
+            cursor_x = self.padding + cursor_location.column * self.char_width
+            cursor_y_start = (folds.display_row(cursor_location.row) - folds.display_row(first_row)) * self.line_height + self.padding
+            cursor_y_end = cursor_y_start + self.line_height
+            self.canvas.create_line(cursor_x, cursor_y_start, cursor_x, cursor_y_end, fill='blue', width=2)
+        self.render_item_count = item_count
+        self.minimap.update_view(first_row, last_row, cursor_location.row, selection)
+        self.schedule_spell_check()
+
+    def draw_squiggle(self, start_col, end_col, y_pos):
+        x_start = self.padding + start_col * self.char_width
+        x_end = self.padding + end_col * self.char_width
+        points = []
+        for step, x in enumerate(range(int(x_start), int(x_end) + 1, 3)):
+            points.extend((x, y_pos + (2 if step % 2 else 0)))
+        if len(points) >= 4:
+            self.canvas.create_line(*points, fill=self.squiggle_color)
+
+    # --- Spell checking ---
+    def schedule_spell_check(self):
+        # the rest of the document is checked in small slices while the editor is idle
+        if self.spell_checker is not None and self.spell_check_job is None and self.spell_checker.has_unchecked():
+            self.spell_check_job = self.after(self.spell_check_delay, self.run_spell_check)
+
+    def run_spell_check(self):
+        self.spell_check_job = None
+        if self.spell_checker.check_some():
+            self.spell_check_job = self.after(1, self.run_spell_check)
 
     # --- Observer metode ---
     def update_cursor_location(self, location: Location):
@@ -173,4 +441,6 @@ class TextEditor(tk.Frame, CursorObserver, TextObserver):
 
     def update_text(self):
         self.redraw(cursor_location=self.model.get_cursor_location())
+        if self.completion_popup.is_open():
+            self.show_completions()  # the list follows the word being typed
         self.master.update_ui_state() # notify main window to update buttons
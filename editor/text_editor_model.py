@@ -1,38 +1,79 @@
+from contextlib import contextmanager
+
 from position.location_range import LocationRange
 from position.location import Location
+from editor.line_buffer import LineBuffer
+from editor.document_snapshot import DocumentSnapshot
+from editor.fold_index import FoldIndex
 from observers.cursor.curser_observer import CursorObserver
 from observers.text.text_observer import TextObserver
+from observers.lines.line_observer import LineObserver
 from commands.insert_text_action import InsertTextAction
 from commands.delete_action import DeleteAction
 from stack.undo_manager import UndoManager
 
 
 class TextEditorModel:
-    def __init__(self, text=''):
-        self.lines = text.split('\n') if text else []
+    def __init__(self, text='', undo_manager=None):
+        # line observers are told about every changed line right away (not suspended),
+        # so that indexes kept parallel to the lines never get out of sync
+        self.line_observers = []
+        self.lines = text.split('\n')  # an empty document still has one (empty) line
+        self.folds = FoldIndex(self)  # folded regions, hidden rows are skipped by cursor movement
+        self.add_line_observer(self.folds)
         self.cursor_location = Location(0, 0)
         self.selection_range = LocationRange(start=Location(0, 0), end=Location(0, 0))
         self.cursor_observers = []
         self.text_observers = []
+        # while notifications are suspended, observers are notified once at the end instead
+        self._notifications_suspended = 0
+        self._pending_text_notification = False
+        self._pending_cursor_notification = False
+
+        # documents of a workspace pass their own undo manager, otherwise the shared one is used
+        self.undo_manager = undo_manager if undo_manager is not None else UndoManager.get_instance()
+        self.undo_manager.attach_model(self)
+
+    @property
+    def lines(self):
+        return self._lines
+
+    @lines.setter
+    def lines(self, lines):
+        # lines are kept in a chunked LineBuffer, which makes snapshots cheap
+        old_count = len(self._lines) if hasattr(self, '_lines') else 0
+        self._lines = lines if isinstance(lines, LineBuffer) else LineBuffer(lines)
+        self.notify_line_observers(0, old_count, len(self._lines))
+
+    # --- Snapshots ---
+    def snapshot(self):
+        # O(1) (one reference per chunk) immutable view, it stays valid while editing continues
+        return DocumentSnapshot.of(self._lines)
+
+    def restore_snapshot(self, snapshot: DocumentSnapshot):
+        # replaces the document with the snapshot, sharing its chunks until they are edited
+        self.lines = LineBuffer.from_chunks(*snapshot.chunks())
+        self.cursor_location = Location(0, 0)
+        self.selection_range = LocationRange(start=Location(0, 0), end=Location(0, 0))
 
-        self.undo_manager = UndoManager.get_instance()
+        self.notify_text_observers()
+        self.notify_cursor_observers()
 
     def all_lines(self):
         for line in self.lines:
             yield line
 
     def lines_range(self, index1, index2):
-        if index1 < 0 or index2 >= len(self.lines):
+        if index1 < 0 or index2 > len(self.lines):
             raise IndexError('Index out of range')
-        for i in range(index1, index2):
-            yield self.lines[i]
+        yield from self.lines.iter_range(index1, index2)
 
     # --- Cursor movement methods ---
     def do_move_left(self):
         if self.cursor_location.column > 0:
             self.cursor_location.column -= 1
         elif self.cursor_location.row > 0:
-            self.cursor_location.row -= 1
+            self.cursor_location.row = self.folds.previous_visible(self.cursor_location.row - 1)
             self.cursor_location.column = len(self.lines[self.cursor_location.row])
         self.notify_cursor_observers()
 
@@ -43,8 +84,8 @@ class TextEditorModel:
     def do_move_right(self):
         if self.cursor_location.column < len(self.lines[self.cursor_location.row]):
             self.cursor_location.column += 1
-        elif self.cursor_location.row < len(self.lines) - 1:
-            self.cursor_location.row += 1
+        elif self.folds.next_visible(self.cursor_location.row + 1) < len(self.lines):
+            self.cursor_location.row = self.folds.next_visible(self.cursor_location.row + 1)
             self.cursor_location.column = 0
         self.notify_cursor_observers()
 
@@ -54,7 +95,7 @@ class TextEditorModel:
 
     def do_move_up(self):
         if self.cursor_location.row > 0:
-            self.cursor_location.row -= 1
+            self.cursor_location.row = self.folds.previous_visible(self.cursor_location.row - 1)
             self.cursor_location.column = min(self.cursor_location.column, len(self.lines[self.cursor_location.row]))
         # if in the first line, go to the start of the line
         elif self.cursor_location.row == 0:
@@ -66,12 +107,15 @@ class TextEditorModel:
         self.do_move_up()
 
     def do_move_down(self):
-        if self.cursor_location.row < len(self.lines) - 1:
-            self.cursor_location.row += 1
+        next_row = self.folds.next_visible(self.cursor_location.row + 1)  # folded rows are skipped
+        if next_row < len(self.lines):
+            self.cursor_location.row = next_row
             self.cursor_location.column = min(self.cursor_location.column, len(self.lines[self.cursor_location.row]))
         # if in the last line, go to the end of the line
         elif self.cursor_location.row == len(self.lines) - 1:
             self.cursor_to_document_end()
+        else:  # only folded rows follow
+            self.cursor_location.column = len(self.lines[self.cursor_location.row])
         self.notify_cursor_observers()
 
     def move_cursor_down(self):
@@ -91,14 +135,55 @@ class TextEditorModel:
     def remove_text_observer(self, observer: TextObserver):
         self.text_observers.remove(observer)
 
+    def add_line_observer(self, observer: LineObserver):
+        self.line_observers.append(observer)
+
+    def remove_line_observer(self, observer: LineObserver):
+        self.line_observers.remove(observer)
+
+    def notify_line_observers(self, start_row, removed_count, inserted_count):
+        for observer in self.line_observers:
+            observer.update_lines(start_row, removed_count, inserted_count)
+
     def notify_cursor_observers(self):
+        if self._notifications_suspended:
+            self._pending_cursor_notification = True
+            return
         for observer in self.cursor_observers:
             observer.update_cursor_location(self.cursor_location)
     
     def notify_text_observers(self):
+        if self._notifications_suspended:
+            self._pending_text_notification = True
+            return
         for observer in self.text_observers:
             observer.update_text()
 
+    def has_pending_text_notification(self):
+        return self._pending_text_notification
+
+    def restore_pending_text_notification(self, pending):
+        # used when suspended edits were rolled back, observers are not told about a change that did not happen
+        self._pending_text_notification = pending
+
+    @contextmanager
+    def suspend_notifications(self):
+        # groups many edits so that observers (and the UI) are updated only once
+        self._notifications_suspended += 1
+        try:
+            yield self
+        finally:
+            self._notifications_suspended -= 1
+            if not self._notifications_suspended:
+                notify_text = self._pending_text_notification
+                notify_cursor = self._pending_cursor_notification
+                self._pending_text_notification = False
+                self._pending_cursor_notification = False
+                if notify_text:
+                    self.notify_text_observers()
+                if notify_cursor:
+                    self.notify_cursor_observers()
+
     # --- Cursor and selection methods ---
     def get_cursor_location(self):
         return self.cursor_location
@@ -190,8 +275,7 @@ class TextEditorModel:
         end_location = Location(location.row, len(self.lines[location.row]))
 
         if len(lines_to_insert) > 1:  # if there are multiple lines to insert
-            for i in range(1, len(lines_to_insert)):
-                self.lines.insert(location.row + i, lines_to_insert[i])
+            self.lines.replace(location.row + 1, location.row + 1, lines_to_insert[1:])
             
             end_row = location.row + len(lines_to_insert) - 1
             self.lines[end_row] += tail
@@ -199,8 +283,18 @@ class TextEditorModel:
         else:  # if only one line to insert
             self.lines[location.row] += tail
         
+        self.notify_line_observers(location.row, 1, len(lines_to_insert))
         return end_location
 
+    def _internal_replace_lines(self, start, count, new_lines):
+        # replaces whole lines, used for edits that come from outside (e.g. reloading a changed file)
+        self.lines.replace(start, start + count, new_lines)
+        inserted_count = len(new_lines)
+        if not len(self.lines):
+            self.lines.append('')
+            inserted_count = 1
+        self.notify_line_observers(start, count, inserted_count)
+
     def delete_before(self):
         if not self.selection_range.is_empty():
             delete_cmd = DeleteAction(self, self.selection_range)
@@ -259,6 +353,7 @@ class TextEditorModel:
         self.lines[start.row] = first_line_part + last_line_part
         if end.row > start.row:
             del self.lines[start.row + 1 : end.row + 1]
+        self.notify_line_observers(start.row, end.row - start.row + 1, 1)
         self.set_cursor_location(start)
         self.set_selection_range(start, start)
 
@@ -0,0 +1,78 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# same module lookup the editor sets up, plugins import their siblings directly
+for dirpath, dirnames, filenames in os.walk(script_dir):
+    if dirpath not in sys.path:
+        sys.path.append(dirpath)
+if script_dir in sys.path:
+    sys.path.remove(script_dir)
+sys.path.insert(0, script_dir)
+
+from batch.batch_runner import run_batch
+from batch.transforms import TRANSFORMS
+from plugins.plugin_loader import load_plugins
+
+
+def expand_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True))
+        paths.extend(path for path in (matches or [pattern]) if os.path.isfile(path))
+    return list(dict.fromkeys(paths))  # drop duplicates, keep order
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run GoatPad plugins or line transforms over files without the UI.')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--plugin', help='name of the plugin to run (see --list)')
+    action.add_argument('--transform', choices=sorted(TRANSFORMS), help='line transform to stream over the files')
+    action.add_argument('--list', action='store_true', help='list available plugins and transforms')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: CPU count)')
+    parser.add_argument('-o', '--output-dir', help='write results into this directory instead of in place')
+    parser.add_argument('files', nargs='*', help='files or glob patterns')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.list:
+        print('Plugins:')
+        for plugin in load_plugins(os.path.join(script_dir, 'plugins'), verbose=False):
+            print(f'  {plugin.get_name()} - {plugin.get_description()}')
+        print('Transforms:')
+        for name in sorted(TRANSFORMS):
+            print(f'  {name}')
+        return 0
+
+    paths = expand_paths(args.files)
+    if not paths:
+        print('No files to process.')
+        return 1
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    kind, name = ('plugin', args.plugin) if args.plugin else ('transform', args.transform)
+    start = time.perf_counter()
+    failed = 0
+    total_lines = 0
+    for result in run_batch(kind, name, paths, args.output_dir, args.jobs):
+        if result.error:
+            failed += 1
+            print(f'FAIL  {result.seconds * 1000:9.1f} ms  {result.path}: {result.error}')
+        else:
+            total_lines += result.lines
+            print(f'ok    {result.seconds * 1000:9.1f} ms  {result.lines:>9} lines  {result.path}')
+    elapsed = time.perf_counter() - start
+
+    print(f'{len(paths) - failed}/{len(paths)} files, {total_lines} lines in {elapsed:.2f} s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
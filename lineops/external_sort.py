@@ -0,0 +1,86 @@
+import heapq
+import os
+import tempfile
+
+from editor.line_buffer import line_size
+
+
+MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of lines (and keys) sorted in memory before runs go to disk
+KEY_OVERHEAD = 2  # a computed key costs about as much as the line it was made from
+
+
+def _write_lines(path_or_fd, lines):
+    with open(path_or_fd, 'w', encoding='utf-8', errors='surrogatepass', newline='\n') as file:
+        for line in lines:
+            file.write(line)
+            file.write('\n')
+
+
+def _read_lines(path):
+    # lines never contain '\n', only '\n' ends a line ('\r' stays part of it)
+    with open(path, 'r', encoding='utf-8', errors='surrogatepass', newline='\n') as file:
+        for line in file:
+            yield line[:-1]
+
+
+class ExternalSorter:
+    # stable sort of a stream of lines; while the lines fit in the memory budget they are sorted in memory,
+    # beyond it sorted runs are written to temporary files and merged lazily
+    def __init__(self, key=None, reverse=False, memory_budget=MEMORY_BUDGET, temp_dir=None):
+        self.key = key
+        self.reverse = reverse
+        self.memory_budget = memory_budget
+        self.temp_dir = temp_dir
+        self.run = []
+        self.run_bytes = 0
+        self.run_paths = []
+        self._readers = []
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, line):
+        self.run.append(line)
+        self.run_bytes += line_size(line) * (KEY_OVERHEAD if self.key is not None else 1)
+        self.count += 1
+        if self.run_bytes > self.memory_budget:
+            self._spill()
+
+    def is_external(self):
+        return bool(self.run_paths)
+
+    def _spill(self):
+        self.run.sort(key=self.key, reverse=self.reverse)
+        fd, path = tempfile.mkstemp(prefix='goatpad-sort-', suffix='.run', dir=self.temp_dir)
+        self.run_paths.append(path)
+        _write_lines(fd, self.run)
+        self.run = []
+        self.run_bytes = 0
+
+    def sorted_run(self):
+        # when everything fit in memory: the list of added lines itself, sorted in place
+        self.run.sort(key=self.key, reverse=self.reverse)
+        return self.run
+
+    def sorted(self):
+        # iterator over all added lines in order, equal lines keep the order they were added in
+        if not self.run_paths:
+            return iter(self.sorted_run())
+        if self.run:
+            self._spill()
+        self._readers = [_read_lines(path) for path in self.run_paths]
+        return heapq.merge(*self._readers, key=self.key, reverse=self.reverse)
+
+    def close(self):
+        for reader in self._readers:
+            reader.close()
+        for path in self.run_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self._readers = []
+        self.run_paths = []
+        self.run = []
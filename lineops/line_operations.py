@@ -0,0 +1,186 @@
+import re
+
+from commands.replace_lines_action import ReplaceLinesAction
+from editor.line_buffer import line_size
+from lineops.external_sort import ExternalSorter, MEMORY_BUDGET
+
+
+PROGRESS_INTERVAL = 20000  # lines between two progress reports
+SET_ENTRY_SIZE = 40  # approximate cost of one entry of the set of seen lines
+ROW_WIDTH = 12  # hex digits of the row numbers written next to lines in external runs
+MAX_HUNKS = 1000  # more separate removals are applied as one replacement (each hunk notifies the observers)
+NUMBER_PATTERN = re.compile(r'\s*[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?')
+
+
+def _numeric_key(line):
+    # lines that start with a number come first, in numeric order
+    match = NUMBER_PATTERN.match(line)
+    return (0, float(match.group()), line) if match else (1, 0.0, line)
+
+
+def sort_key(spec):
+    # parses a key description into (key function, reverse):
+    # text, nocase, length, numeric, field:N (whitespace separated, from 1) or regex:PATTERN,
+    # a leading '-' sorts in descending order
+    spec = spec.strip() or 'text'
+    reverse = spec.startswith('-')
+    spec = spec.lstrip('-')
+    name, _, argument = spec.partition(':')
+    if name == 'text':
+        return None, reverse
+    if name == 'nocase':
+        return str.casefold, reverse
+    if name == 'length':
+        return len, reverse
+    if name == 'numeric':
+        return _numeric_key, reverse
+    if name == 'field':
+        index = int(argument) - 1
+        if index < 0:
+            raise ValueError('Fields are numbered from 1')
+        return (lambda line: (line.split()[index:index + 1] or [''])[0]), reverse
+    if name == 'regex':
+        pattern = re.compile(argument)
+
+        def regex_key(line):
+            match = pattern.search(line)
+            if match is None:
+                return ''
+            if not pattern.groups:
+                return match.group()
+            return match.group(1) or ''  # None when the group did not take part in the match
+        return regex_key, reverse
+    raise ValueError(f'Unknown sort key: {spec}')
+
+
+def _report(progress, done, total):
+    if progress is not None and done % PROGRESS_INTERVAL == 0:
+        progress(done, total)
+
+
+def sorted_lines(lines, count, key=None, reverse=False, memory_budget=MEMORY_BUDGET, progress=None):
+    # sorted copy of the lines, runs beyond the memory budget are sorted on disk;
+    # progress(done, total) is called while reading and while merging
+    total = 2 * count
+    with ExternalSorter(key, reverse, memory_budget) as sorter:
+        for done, line in enumerate(lines, 1):
+            sorter.add(line)
+            _report(progress, done, total)
+        if not sorter.is_external():
+            return sorter.sorted_run()
+        result = []
+        for done, line in enumerate(sorter.sorted(), count + 1):
+            result.append(line)
+            _report(progress, done, total)
+    return result
+
+
+def unique_rows(lines_factory, count, memory_budget=MEMORY_BUDGET, progress=None):
+    # offsets of the first occurrence of every distinct line, in order; lines_factory() returns a fresh
+    # iterator over the lines, it is called again when the seen lines do not fit in the memory budget
+    seen = set()
+    used = 0
+    kept = []
+    for row, line in enumerate(lines_factory()):
+        if line not in seen:
+            seen.add(line)
+            used += line_size(line) + SET_ENTRY_SIZE
+            if used > memory_budget:
+                break
+            kept.append(row)
+        _report(progress, row + 1, count)
+    else:
+        return kept
+    seen = kept = None
+
+    # too many distinct lines: sort (line, row) pairs on disk, keep the first row of every line
+    # and sort those rows back into document order
+    total = 3 * count
+    with ExternalSorter(lambda record: (record[ROW_WIDTH + 1:], record[:ROW_WIDTH]), memory_budget=memory_budget) as by_line, \
+            ExternalSorter(memory_budget=memory_budget) as by_row:
+        for row, line in enumerate(lines_factory()):
+            by_line.add(f'{row:0{ROW_WIDTH}x}\t{line}')
+            _report(progress, row + 1, total)
+        previous = None
+        for done, record in enumerate(by_line.sorted(), count + 1):
+            line = record[ROW_WIDTH + 1:]
+            if line != previous:
+                by_row.add(record[:ROW_WIDTH])
+                previous = line
+            _report(progress, done, total)
+        return [int(record, 16) for record in by_row.sorted()]
+
+
+def filter_rows(lines, pattern, invert=False, progress=None, count=None):
+    # offsets of the lines that match the regular expression (or do not, when inverted)
+    search = re.compile(pattern).search
+    kept = []
+    for row, line in enumerate(lines):
+        if (search(line) is None) == invert:
+            kept.append(row)
+        _report(progress, row + 1, count)
+    return kept
+
+
+def removal_hunks(snapshot, start_row, stop_row, kept_rows):
+    # (start, removed lines, []) for every run of rows between start_row and stop_row that is not kept
+    runs = []
+    next_row = start_row
+    for offset in kept_rows:
+        row = start_row + offset
+        if row > next_row:
+            runs.append((next_row, row))
+        next_row = row + 1
+    if stop_row > next_row:
+        runs.append((next_row, stop_row))
+    if not runs:
+        return []
+    if not kept_rows and start_row == 0 and stop_row == len(snapshot):
+        return [(0, list(snapshot.lines_range(0, stop_row)), [''])]  # a document always keeps one (empty) line
+    if len(runs) > MAX_HUNKS:
+        # one hunk from the first to the last removed row, the kept rows in between are taken from it
+        first_row, last_row = runs[0][0], runs[-1][1]
+        old = list(snapshot.lines_range(first_row, last_row))
+        new = [old[row - first_row] for row in (start_row + offset for offset in kept_rows)
+               if first_row <= row < last_row]
+        return [(first_row, old, new)]
+    return [(first, list(snapshot.lines_range(first, stop)), []) for first, stop in runs]
+
+
+def target_rows(model):
+    # the selected lines, or the whole document when nothing (or less than a line) is selected
+    selection = model.get_selection_range()
+    if selection.is_empty() or selection.start.row == selection.end.row:
+        stop_row = len(model.lines)
+        if stop_row > 1 and not model.lines[stop_row - 1]:
+            stop_row -= 1  # the empty line after a final newline stays last
+        return 0, stop_row
+    stop_row = selection.end.row + (1 if selection.end.column > 0 else 0)
+    return selection.start.row, stop_row
+
+
+# --- Undoable operations ---
+def sort_action(model, key=None, reverse=False, memory_budget=MEMORY_BUDGET, progress=None):
+    start_row, stop_row = target_rows(model)
+    snapshot = model.snapshot()  # stays valid even if the document changes meanwhile
+    result = sorted_lines(snapshot.lines_range(start_row, stop_row), stop_row - start_row,
+                          key, reverse, memory_budget, progress)
+    old = list(snapshot.lines_range(start_row, stop_row))
+    return ReplaceLinesAction(model, [(start_row, old, result)]) if old != result else None
+
+
+def unique_action(model, memory_budget=MEMORY_BUDGET, progress=None):
+    start_row, stop_row = target_rows(model)
+    snapshot = model.snapshot()
+    kept = unique_rows(lambda: snapshot.lines_range(start_row, stop_row), stop_row - start_row,
+                       memory_budget, progress)
+    hunks = removal_hunks(snapshot, start_row, stop_row, kept)
+    return ReplaceLinesAction(model, hunks) if hunks else None
+
+
+def filter_action(model, pattern, invert=False, progress=None):
+    start_row, stop_row = target_rows(model)
+    snapshot = model.snapshot()
+    kept = filter_rows(snapshot.lines_range(start_row, stop_row), pattern, invert, progress, stop_row - start_row)
+    hunks = removal_hunks(snapshot, start_row, stop_row, kept)
+    return ReplaceLinesAction(model, hunks) if hunks else None
@@ -0,0 +1,40 @@
+import tkinter as tk
+
+from memory.memory_tracker import format_size
+
+
+class MemoryPanel(tk.Toplevel):
+    REFRESH_INTERVAL = 1000  # ms
+
+    def __init__(self, parent, tracker):
+        super().__init__(parent)
+        self.title('Memory')
+        self.geometry('380x320')
+        self.tracker = tracker
+
+        self.label = tk.Label(self, justify=tk.LEFT, anchor='nw', font=('Courier', 11))
+        self.label.pack(fill='both', expand=True, padx=8, pady=8)
+        self.refresh()
+
+    def refresh(self):
+        if not self.winfo_exists():
+            return
+        report = self.tracker.report()
+        rows = [
+            ('Buffers', report['buffer'], f'{report["resident_documents"]} resident, '
+                                          f'{report["evicted_documents"]} evicted'),
+            ('Undo history', report['undo'], ''),
+        ]
+        for type_name, (count, size) in sorted(report['undo_by_type'].items(), key=lambda item: -item[1][1]):
+            rows.append((f'  {type_name}', size, f'{count} entries' if count else ''))
+        rows.append(('Clipboard', report['clipboard'], f'{report["clipboard_items"]} items'))
+        rows.append(('Render items', report['render'], f'{report["render_items"]} items'))
+        rows.append(('Total', report['total'], ''))
+
+        lines = [f'{name:<22}{format_size(size):>10}  {detail}' for name, size, detail in rows]
+        warnings = self.tracker.warnings(report)
+        if warnings:
+            lines.append('')
+            lines.extend(f'! {warning}' for warning in warnings)
+        self.label.config(text='\n'.join(lines), fg='red' if warnings else 'black')
+        self.after(self.REFRESH_INTERVAL, self.refresh)
@@ -0,0 +1,65 @@
+MB = 1024 * 1024
+RENDER_ITEM_SIZE = 512  # rough cost of one canvas item (Tk item plus the Python side)
+
+DEFAULT_THRESHOLDS = {
+    'total': 1024 * MB,
+    'buffer': 512 * MB,
+    'undo': 256 * MB,
+    'clipboard': 64 * MB,
+}
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+class MemoryTracker:
+    # collects the memory estimates that the subsystems keep up to date themselves,
+    # so a report costs O(documents + command types) and never walks the text or the history
+    def __init__(self, workspace, clipboard, text_editor=None, thresholds=None):
+        self.workspace = workspace
+        self.clipboard = clipboard
+        self.text_editor = text_editor
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        if thresholds:
+            self.thresholds.update(thresholds)
+
+    def report(self):
+        buffer_size = 0
+        undo_size = 0
+        undo_by_type = {}
+        for document in self.workspace.resident_documents():
+            buffer_size += document.model.lines.estimated_bytes()
+            undo_manager = document.undo_manager
+            undo_size += undo_manager.estimated_bytes()
+            for type_name, size in undo_manager.bytes_by_type.items():
+                count, total = undo_by_type.get(type_name, (0, 0))
+                undo_by_type[type_name] = (count + undo_manager.count_by_type[type_name], total + size)
+            if undo_manager.checkpoint_bytes:
+                count, total = undo_by_type.get('checkpoints', (0, 0))
+                undo_by_type['checkpoints'] = (count, total + undo_manager.checkpoint_bytes)
+
+        render_items = self.text_editor.render_item_count if self.text_editor is not None else 0
+        report = {
+            'buffer': buffer_size,
+            'undo': undo_size,
+            'undo_by_type': undo_by_type,
+            'clipboard': self.clipboard.size,
+            'clipboard_items': len(self.clipboard.texts),
+            'render': render_items * RENDER_ITEM_SIZE,
+            'render_items': render_items,
+            'resident_documents': len(self.workspace.resident_documents()),
+            'evicted_documents': len(self.workspace.documents) - len(self.workspace.resident_documents()),
+        }
+        report['total'] = report['buffer'] + report['undo'] + report['clipboard'] + report['render']
+        return report
+
+    def warnings(self, report=None):
+        report = report or self.report()
+        return [f'{name} memory {format_size(report[name])} exceeds {format_size(limit)}'
+                for name, limit in self.thresholds.items()
+                if limit is not None and report.get(name, 0) > limit]
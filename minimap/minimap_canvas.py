@@ -0,0 +1,218 @@
+import tkinter as tk
+from math import ceil
+
+from observers.lines.line_observer import LineObserver
+
+
+MINIMAP_WIDTH = 80  # pixels
+COLUMNS_PER_PIXEL = 2  # a line of 160 characters fills the whole strip
+
+
+class Minimap(tk.Canvas, LineObserver):
+    # overview of the whole document next to the editor: every band (one or two pixel rows) stands for
+    # one or more lines and shows their average length, the selection and search hits;
+    # the bitmap is cached and only the bands whose content changed are painted again
+    def __init__(self, parent, editor, width=MINIMAP_WIDTH, **kwargs):
+        super().__init__(parent, width=width, highlightthickness=0, **kwargs)
+        self.editor = editor
+        self.model = None
+        self.strip_width = width
+        self.background_color = '#f5f5f5'
+        self.text_color = '#a0a0a0'
+        self.selection_color = '#d2e4ff'
+        self.hit_color = '#ff9900'
+        self.cursor_color = 'blue'
+        self.viewport_color = '#606060'
+
+        # kept parallel to the lines of the model
+        self.line_lengths = []
+        self.hits = bytearray()  # 1 for every line that contains the search text
+        self.search_text = ''
+        self.selection_rows = None  # first and last selected row
+
+        self.layout = None  # (lines per band, band height)
+        self.band_values = []  # what every band of the bitmap currently shows
+        self.dirty_start = self.dirty_stop = None  # lines whose bands may have to be painted again
+        self.repaint_job = None
+        self.viewport = (0, 0)
+        self.cursor_row = 0
+
+        self.image = tk.PhotoImage(width=width, height=1)
+        self.image_item = self.create_image(0, 0, image=self.image, anchor='nw')
+        self.viewport_item = self.create_rectangle(0, 0, 0, 0, outline=self.viewport_color)
+        self.cursor_item = self.create_line(0, 0, 0, 0, fill=self.cursor_color)
+
+        self.bind('<Button-1>', self.handle_click)
+        self.bind('<B1-Motion>', self.handle_click)
+        self.bind('<Configure>', lambda e: self.schedule_repaint())  # the layout depends on the height
+
+    def attach(self, model):
+        if self.model is not None:
+            self.model.remove_line_observer(self)
+        self.model = model
+        model.add_line_observer(self)
+        self.line_lengths = [len(line) for line in model.lines]
+        self.hits = self._find_hits(model.lines)
+        self.selection_rows = None
+        self.mark_dirty(0, len(self.line_lengths))
+
+    # --- Observer methods ---
+    def update_lines(self, start_row, removed_count, inserted_count):
+        lines = list(self.model.lines_range(start_row, start_row + inserted_count))
+        self.line_lengths[start_row:start_row + removed_count] = [len(line) for line in lines]
+        self.hits[start_row:start_row + removed_count] = self._find_hits(lines)
+        stop = start_row + inserted_count
+        if removed_count != inserted_count:
+            # every line below the edit moves to another band
+            if self.layout is not None and self.layout[0] == 1:
+                self._shift_bands(start_row + removed_count, start_row + inserted_count)
+            else:
+                stop = len(self.line_lengths)
+        self.mark_dirty(start_row, stop)
+
+    def update_view(self, first_row, last_row, cursor_row, selection):
+        # called by the editor after every redraw, the viewport and cursor are canvas items on top of the bitmap
+        selection_rows = None if selection.is_empty() else (selection.start.row, selection.end.row)
+        if selection_rows != self.selection_rows:
+            for rows in (self.selection_rows, selection_rows):
+                if rows is not None:
+                    self.mark_dirty(rows[0], rows[1] + 1)
+            self.selection_rows = selection_rows
+        self.viewport = (first_row, last_row)
+        self.cursor_row = cursor_row
+        self.place_markers()
+
+    # --- Search hits ---
+    def _find_hits(self, lines):
+        if not self.search_text:
+            return bytearray(len(lines))
+        return bytearray(self.search_text in line for line in lines)
+
+    def set_search_text(self, text):
+        self.search_text = text
+        self.hits = self._find_hits(self.model.lines)
+        self.mark_dirty(0, len(self.line_lengths))
+
+    def next_hit_row(self, row):
+        # first row at or after row that contains the search text, wrapping around at the end
+        index = self.hits.find(1, row)
+        if index < 0:
+            index = self.hits.find(1, 0, row)
+        return index if index >= 0 else None
+
+    # --- Painting ---
+    def mark_dirty(self, start, stop):
+        self.dirty_start = start if self.dirty_start is None else min(self.dirty_start, start)
+        self.dirty_stop = stop if self.dirty_stop is None else max(self.dirty_stop, stop)
+        self.schedule_repaint()
+
+    def schedule_repaint(self):
+        # edits made in one go (a paste, an undo) are painted once
+        if self.repaint_job is None:
+            self.repaint_job = self.after_idle(self.repaint)
+
+    def _compute_layout(self, height):
+        line_count = len(self.line_lengths)
+        if line_count * 2 <= height:
+            return 1, 2
+        return ceil(line_count / height), 1
+
+    def repaint(self):
+        self.repaint_job = None
+        height = max(self.winfo_height(), 1)
+        layout = self._compute_layout(height)
+        line_count = len(self.line_lengths)
+        if layout != self.layout or height != self.image.height():
+            # a new scale, every band is painted again
+            self.layout = layout
+            self.image = tk.PhotoImage(width=self.strip_width, height=height)
+            self.image.put(self.background_color, to=(0, 0, self.strip_width, height))
+            self.itemconfigure(self.image_item, image=self.image)
+            self.band_values = []
+            self.dirty_start, self.dirty_stop = 0, line_count
+        lines_per_band, band_height = layout
+        band_count = ceil(line_count / lines_per_band)
+
+        if band_count < len(self.band_values):
+            # the document got shorter, the bands below its end are cleared
+            self.image.put(self.background_color, to=(0, band_count * band_height,
+                                                      self.strip_width, len(self.band_values) * band_height))
+            del self.band_values[band_count:]
+        self.band_values.extend([None] * (band_count - len(self.band_values)))
+
+        if self.dirty_start is not None:
+            first_band = self.dirty_start // lines_per_band
+            stop_band = min(ceil(self.dirty_stop / lines_per_band), band_count)
+            for band in range(first_band, stop_band):
+                value = self.band_value(band, lines_per_band)
+                if value != self.band_values[band]:
+                    self.band_values[band] = value
+                    self.paint_band(band, band_height, value)
+        self.dirty_start = self.dirty_stop = None
+        self.place_markers()
+
+    def _shift_bands(self, old_start, new_start):
+        # with one line per band the painted bands are moved along with their lines instead of being painted again
+        band_height = self.layout[1]
+        old_count = len(self.band_values)
+        if old_start >= old_count:
+            return
+        moved = tk.PhotoImage(width=self.strip_width, height=(old_count - old_start) * band_height)
+        moved.tk.call(moved, 'copy', self.image, '-from', 0, old_start * band_height,
+                      self.strip_width, old_count * band_height)
+        self.image.tk.call(self.image, 'copy', moved, '-to', 0, new_start * band_height)
+        self.band_values[new_start:] = self.band_values[old_start:]
+        # lines still waiting to be painted and the selected lines moved as well
+        shift = new_start - old_start
+        if self.dirty_start is not None and self.dirty_stop > old_start:
+            self.dirty_start = min(self.dirty_start, self.dirty_start + shift)
+            self.dirty_stop += max(shift, 0)
+        if self.selection_rows is not None and self.selection_rows[1] >= old_start:
+            first, last = self.selection_rows
+            self.mark_dirty(min(first, first + shift), last + 1 + max(shift, 0))
+        if len(self.band_values) < old_count:
+            self.image.put(self.background_color, to=(0, len(self.band_values) * band_height,
+                                                      self.strip_width, old_count * band_height))
+
+    def band_value(self, band, lines_per_band):
+        start = band * lines_per_band
+        stop = min(start + lines_per_band, len(self.line_lengths))
+        average_length = sum(self.line_lengths[start:stop]) / (stop - start)
+        width = min(ceil(average_length / COLUMNS_PER_PIXEL), self.strip_width)
+        rows = self.selection_rows
+        selected = rows is not None and rows[0] < stop and rows[1] >= start
+        hit = 1 in self.hits[start:stop]
+        return width, selected, hit
+
+    def paint_band(self, band, band_height, value):
+        width, selected, hit = value
+        y_pos = band * band_height
+        background = self.selection_color if selected else self.background_color
+        self.image.put(background, to=(0, y_pos, self.strip_width, y_pos + band_height))
+        if hit:
+            self.image.put(self.hit_color, to=(0, y_pos, self.strip_width, y_pos + band_height))
+        elif width:
+            self.image.put(self.text_color, to=(0, y_pos, width, y_pos + band_height))
+
+    def row_to_y(self, row):
+        lines_per_band, band_height = self.layout
+        return row // lines_per_band * band_height
+
+    def place_markers(self):
+        if self.layout is None:
+            return
+        first_row, last_row = self.viewport
+        band_height = self.layout[1]
+        self.coords(self.viewport_item, 0, self.row_to_y(first_row),
+                    self.strip_width - 1, self.row_to_y(last_row) + band_height)
+        cursor_y = self.row_to_y(self.cursor_row)
+        self.coords(self.cursor_item, 0, cursor_y, self.strip_width, cursor_y)
+
+    # --- Navigation ---
+    def handle_click(self, event):
+        # centres the editor on the clicked lines, the cursor stays where it is
+        if self.layout is None:
+            return
+        lines_per_band, band_height = self.layout
+        row = min(max(event.y, 0) // band_height * lines_per_band, len(self.line_lengths) - 1)
+        self.editor.scroll_to(self.model.folds.advance(row, -(self.editor.visible_row_count() // 2)))
@@ -1,24 +1,28 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog
+from tkinter import messagebox, filedialog, simpledialog
+from datetime import datetime
 import sys
 import os
-import importlib
-import inspect
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 if script_dir not in sys.path:
     sys.path.insert(0, script_dir)
 
-from editor.text_editor_model import TextEditorModel
 from editor.text_editor import TextEditor
 from clipboard.clipboard_stack import ClipboardStack
 from observers.clipboard.clipboard_observer import ClipboardObserver
-from stack.undo_manager import UndoManager
 from observers.stack.undo_manager_observer import UndoManagerObserver
-from plugins.plugin import Plugin
+from plugins.plugin_loader import load_plugins
+from workspace.document_workspace import Workspace
+from observers.workspace.workspace_observer import WorkspaceObserver
+from server.automation_server import AutomationServer, TkDispatcher
+from watcher.file_watcher import FileWatcher
+from memory.memory_tracker import MemoryTracker, format_size
+from memory.memory_panel import MemoryPanel
+from spellcheck.dictionary import SpellDictionary
 
 
-class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver):
+class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver, WorkspaceObserver):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -28,33 +32,50 @@ class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver):
         self.plugins = []
         self.load_plugins()
 
-        # model initialization
-        self.model = TextEditorModel('A faza, stakla puna mraza\nDimi se zaza u limuzini nazad')
-        # self.model = TextEditorModel('This is a sample text for the Notepad application.\nFeel free to edit it as you wish.')
-        self.undo_manager = UndoManager.get_instance()
+        # workspace initialization, every document has its own model and undo manager
+        self.workspace = Workspace()
+        self.workspace.new_document('A faza, stakla puna mraza\nDimi se zaza u limuzini nazad')
+        # self.workspace.new_document('This is a sample text for the Notepad application.\nFeel free to edit it as you wish.')
+        self.observed_document = self.workspace.active_document
         self.clipboard = ClipboardStack()
-        self.text_editor = TextEditor(self, self.model, self.clipboard, self.undo_manager)
+        self.text_editor = TextEditor(self, self.model, self.clipboard, self.undo_manager,
+                                      spell_dictionary=SpellDictionary.load_default())
+        self.memory_tracker = MemoryTracker(self.workspace, self.clipboard, self.text_editor)
 
         self.create_status_bar()
         self.create_toolbar()
+        self.create_tab_bar()
         # text editor initialization
         self.text_editor.pack(side=tk.BOTTOM, fill='both', expand=True)
         
         self.undo_manager.add_observer(self)
         self.clipboard.add_observer(self)
+        self.workspace.add_observer(self)
+
+        # external changes of open files are picked up incrementally
+        self.file_watcher = FileWatcher(self, self.workspace, confirm_reload=self._confirm_reload)
+        self.file_watcher.start()
 
         # UI setup
         self.create_menubar()
         
         self.update_ui_state()
 
+    @property
+    def model(self):
+        return self.workspace.active_document.model
+
+    @property
+    def undo_manager(self):
+        return self.workspace.active_document.undo_manager
+
     def create_toolbar(self):
         self.toolbar = tk.Frame(self, bd=1, relief=tk.RAISED)
         
-        self.undo_button = tk.Button(self.toolbar, text='Undo', command=self.undo_manager.undo)
+        self.undo_button = tk.Button(self.toolbar, text='Undo', command=lambda: self.undo_manager.undo())
         self.undo_button.pack(side=tk.LEFT, padx=2, pady=2)
         
-        self.redo_button = tk.Button(self.toolbar, text='Redo', command=self.undo_manager.redo)
+        self.redo_button = tk.Button(self.toolbar, text='Redo', command=lambda: self.undo_manager.redo())
         self.redo_button.pack(side=tk.LEFT, padx=2, pady=2)
         
         self.cut_button = tk.Button(self.toolbar, text='Cut', command=self.text_editor.handle_cut)
@@ -68,19 +89,49 @@ class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver):
         
         self.toolbar.pack(side=tk.TOP, fill=tk.X)
 
+    def create_tab_bar(self):
+        self.tab_bar = tk.Frame(self, bd=1, relief=tk.GROOVE)
+        self.tab_buttons = {}
+        self.tab_bar.pack(side=tk.TOP, fill=tk.X)
+        self.rebuild_tab_bar()
+
+    def rebuild_tab_bar(self):
+        for button in self.tab_buttons.values():
+            button.destroy()
+        self.tab_buttons = {}
+        for document in self.workspace.documents:
+            button = tk.Button(self.tab_bar, text=document.title,
+                               command=lambda d=document: self.workspace.activate(d))
+            button.pack(side=tk.LEFT, padx=1, pady=1)
+            self.tab_buttons[document] = button
+        self.refresh_tab_titles()
+
+    def refresh_tab_titles(self):
+        for document, button in self.tab_buttons.items():
+            relief = tk.SUNKEN if document is self.workspace.active_document else tk.RAISED
+            button.config(text=document.title, relief=relief)
+
     def create_menubar(self):
         menubar = tk.Menu(self)
         
         file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu.add_command(label='New', command=self._handle_new_file)
         file_menu.add_command(label='Open', command=self._handle_open_file)
         file_menu.add_command(label='Save', command=self._handle_save_file)
+        file_menu.add_command(label='Save As', command=self._handle_save_file_as)
+        file_menu.add_command(label='Close', command=self._handle_close_file)
         file_menu.add_separator()
         file_menu.add_command(label='Exit', command=self.quit)
         menubar.add_cascade(label='File', menu=file_menu)
 
         self.edit_menu = tk.Menu(menubar, tearoff=0)
-        self.edit_menu.add_command(label='Undo', accelerator='Ctrl+Z', command=self.undo_manager.undo)
-        self.edit_menu.add_command(label='Redo', accelerator='Ctrl+Y', command=self.undo_manager.redo)
+        self.edit_menu.add_command(label='Undo', accelerator='Ctrl+Z', command=lambda: self.undo_manager.undo())
+        self.edit_menu.add_command(label='Redo', accelerator='Ctrl+Y', command=lambda: self.undo_manager.redo())
+        self.edit_menu.add_command(label='Go to history state...', command=self._handle_goto_state)
+        self.edit_menu.add_command(label='Go to history time...', command=self._handle_goto_time)
+        self.edit_menu.add_separator()
+        self.edit_menu.add_command(label='Find...', accelerator='Ctrl+F', command=self.text_editor.ask_find)
+        self.edit_menu.add_command(label='Find next', accelerator='F3', command=self.text_editor.find_next)
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label='Cut', accelerator='Ctrl+X', command=self.text_editor.handle_cut)
         self.edit_menu.add_command(label='Copy', accelerator='Ctrl+C', command=self.text_editor.handle_copy)
@@ -88,12 +139,21 @@ class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver):
         self.edit_menu.add_command(label='Paste and Take', command=self.text_editor.handle_paste_and_pop)
         self.edit_menu.add_separator()
         self.edit_menu.add_command(label='Delete selection', command=lambda: self.model.delete_after())
-        self.edit_menu.add_command(label='Clear document', command=self.model.clear_document)
+        self.edit_menu.add_command(label='Clear document', command=lambda: self.model.clear_document())
         menubar.add_cascade(label='Edit', menu=self.edit_menu)
 
+        view_menu = tk.Menu(menubar, tearoff=0)
+        view_menu.add_command(label='Fold', accelerator='Ctrl+[', command=self.text_editor.fold_at_cursor)
+        view_menu.add_command(label='Unfold', accelerator='Ctrl+]', command=self.text_editor.unfold_at_cursor)
+        view_menu.add_command(label='Unfold all', command=self.text_editor.unfold_all)
+        view_menu.add_separator()
+        view_menu.add_command(label='Memory...', command=lambda: MemoryPanel(self, self.memory_tracker))
+        menubar.add_cascade(label='View', menu=view_menu)
+
         move_menu = tk.Menu(menubar, tearoff=0)
-        move_menu.add_command(label='Cursor to document start', command=self.model.cursor_to_document_start)
-        move_menu.add_command(label='Cursor to document end', command=self.model.cursor_to_document_end)
+        move_menu.add_command(label='Cursor to document start', command=lambda: self.model.cursor_to_document_start())
+        move_menu.add_command(label='Cursor to document end', command=lambda: self.model.cursor_to_document_end())
+        move_menu.add_command(label='Cursor to matching bracket', accelerator='Ctrl+M', command=self.text_editor.goto_matching_bracket)
         menubar.add_cascade(label='Move', menu=move_menu)
 
         if self.plugins:
@@ -113,8 +173,8 @@ class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver):
 
     def update_ui_state(self):
         # --- Undo/Redo state ---
-        undo_state = tk.NORMAL if self.undo_manager.undo_stack else tk.DISABLED
-        redo_state = tk.NORMAL if self.undo_manager.redo_stack else tk.DISABLED
+        undo_state = tk.NORMAL if self.undo_manager.can_undo() else tk.DISABLED
+        redo_state = tk.NORMAL if self.undo_manager.can_redo() else tk.DISABLED
         self.undo_button.config(state=undo_state)
         self.edit_menu.entryconfig('Undo', state=undo_state)
         self.redo_button.config(state=redo_state)
@@ -138,7 +198,15 @@ class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver):
         cursor_pos = self.model.get_cursor_location()
         line_count = len(self.model.lines)
         status_text = f'Ln {cursor_pos.row + 1}, Col {cursor_pos.column + 1}  |  Lines: {line_count}'
-        self.status_bar.config(text=status_text)
+        memory_report = self.memory_tracker.report()
+        status_text += f'  |  Mem: {format_size(memory_report["total"])}'
+        memory_warnings = self.memory_tracker.warnings(memory_report)
+        if memory_warnings:
+            status_text += f'  |  {memory_warnings[0]}'
+        self.status_bar.config(text=status_text, fg='red' if memory_warnings else 'black')
+
+        # --- Tabs ---
+        self.refresh_tab_titles()
 
     # --- Observer methods ---
     def update_undo_stack(self, is_empty: bool):
@@ -149,59 +217,101 @@ class Notepad(tk.Tk, UndoManagerObserver, ClipboardObserver):
 
     def update_clipboard(self):
         self.update_ui_state()
+
+    def update_documents(self):
+        # the active document changed, move the editor and our undo observer over to it
+        document = self.workspace.active_document
+        if document is None:
+            self.workspace.new_document()
+            return
+        if document is not self.observed_document:
+            if self.observed_document is not None and self in self.observed_document.undo_manager.observers:
+                self.observed_document.undo_manager.remove_observer(self)
+            document.undo_manager.add_observer(self)
+            self.observed_document = document
+            self.text_editor.set_model(document.model, document.undo_manager)
+        self.rebuild_tab_bar()
+        self.update_ui_state()
         
     # --- File operations ---
+    def _handle_new_file(self):
+        self.workspace.new_document()
+
     def _handle_open_file(self):
         file_path = filedialog.askopenfilename(defaultextension='.txt',
                                                   filetypes=[('Text files', '*.txt'), ('All files', '*.*')])
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    self.model.set_text(content)
+                self.workspace.open_document(file_path)
             except Exception as e:
                 messagebox.showerror('Error', f'Could not open file: {e}')
 
     def _handle_save_file(self):
+        document = self.workspace.active_document
+        if document.file_path is None:
+            self._handle_save_file_as()
+            return
+        try:
+            document.save()
+        except Exception as e:
+            messagebox.showerror('Error', f'Could not save file: {e}')
+        self.update_ui_state()
+
+    def _handle_save_file_as(self):
         file_path = filedialog.asksaveasfilename(defaultextension='.txt',
                                                      filetypes=[('Text files', '*.txt'), ('All files', '*.*')])
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    content = self.model.get_text()
-                    file.write(content)
+                self.workspace.active_document.save(file_path)
             except Exception as e:
                 messagebox.showerror('Error', f'Could not save file: {e}')
+            self.update_ui_state()
+
+    def _confirm_reload(self, document):
+        return messagebox.askyesno('File changed', f'{document.title[1:]} was changed on disk. '
+                                                   f'Reload it and replace your unsaved changes?')
+
+    def _handle_close_file(self):
+        document = self.workspace.active_document
+        if document.modified and not messagebox.askyesno('Close', f'Discard unsaved changes in {document.title[1:]}?'):
+            return
+        self.workspace.close_document(document)
+
+    # --- History navigation ---
+    def _handle_goto_state(self):
+        last_state = self.undo_manager.state_count() - 1
+        number = simpledialog.askinteger('Go to history state', f'State number (0 - {last_state}):',
+                                         initialvalue=self.undo_manager.current_state(),
+                                         minvalue=0, maxvalue=last_state, parent=self)
+        if number is not None:
+            self.undo_manager.goto_state(number)
+
+    def _handle_goto_time(self):
+        value = simpledialog.askstring('Go to history time', 'Time of day (HH:MM or HH:MM:SS):', parent=self)
+        if not value:
+            return
+        try:
+            parsed = datetime.strptime(value, '%H:%M:%S' if value.count(':') == 2 else '%H:%M')
+        except ValueError:
+            messagebox.showerror('Error', f'Invalid time: {value}')
+            return
+        moment = datetime.now().replace(hour=parsed.hour, minute=parsed.minute, second=parsed.second, microsecond=0)
+        self.undo_manager.goto_time(moment.timestamp() + 0.999999)  # include edits made during that second
+
+    # --- Automation ---
+    def start_automation_server(self, socket_path):
+        # the server runs in its own thread, edits are applied on the Tk thread by the dispatcher
+        dispatcher = TkDispatcher(self, self.workspace)
+        self.automation_server = AutomationServer(self.workspace, socket_path, dispatcher)
+        self.automation_server.start_in_thread()
 
     # --- Plugin loading ---
-    def _is_plugin(self, obj):
-        return inspect.isclass(obj) and obj.__bases__[0].__name__ == Plugin.__name__
-
     def load_plugins(self):
-        plugins_dir = 'plugins'
-
-        print(f'Loading plugins...')
-
-        for filename in os.listdir(plugins_dir):
-            if filename.endswith('.py') and filename != '__init__.py':
-                module_name = f'{plugins_dir}.{filename[:-3]}'
-                try:
-                    module = importlib.import_module(module_name)
-                    for name, obj in inspect.getmembers(module):
-
-                        if self._is_plugin(obj):
-                            plugin_instance = obj()  # create an instance of the plugin
-                            self.plugins.append(plugin_instance)
-                            print(f'Plugin {plugin_instance.get_name()} loaded successfully.')
-                except Exception as e:
-                    print(f'Failed to load plugin {filename}: {e}')
-        
-        if not self.plugins:
-            print('No plugins found.')
-        else:
-            print(f'Loaded {len(self.plugins)} plugins.')
+        self.plugins.extend(load_plugins(os.path.join(script_dir, 'plugins')))
 
 
 if __name__ == '__main__':
     app = Notepad()
+    if '--automation-socket' in sys.argv[1:-1]:
+        app.start_automation_server(sys.argv[sys.argv.index('--automation-socket') + 1])
     app.mainloop()
\ No newline at end of file
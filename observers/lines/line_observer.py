@@ -0,0 +1,7 @@
+from abc import ABC, abstractmethod
+
+class LineObserver(ABC):
+    @abstractmethod
+    def update_lines(self, start_row: int, removed_count: int, inserted_count: int):
+        # lines[start_row:start_row + removed_count] were replaced by inserted_count new lines
+        pass
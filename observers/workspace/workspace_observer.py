@@ -0,0 +1,7 @@
+from abc import ABC, abstractmethod
+
+class WorkspaceObserver(ABC):
+    @abstractmethod
+    def update_documents(self):
+        # called when a document is opened, closed or activated
+        pass
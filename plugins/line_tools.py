@@ -0,0 +1,110 @@
+import os
+import re
+import tkinter as tk
+from tkinter import messagebox, simpledialog, ttk
+
+from plugin import Plugin
+from lineops.line_operations import sort_key, sort_action, unique_action, filter_action
+
+
+def has_display():
+    # without a Tk root (headless batch mode) the options come from the environment and errors are raised
+    return tk._default_root is not None
+
+
+def filter_pattern(text):
+    # a leading '!' keeps the lines that do not match
+    return (text[1:], True) if text.startswith('!') else (text, False)
+
+
+class ProgressWindow(tk.Toplevel):
+    # small window with a progress bar, shown while a line operation reads the document
+    def __init__(self, title):
+        super().__init__()
+        self.title(title)
+        self.resizable(False, False)
+        self.bar = ttk.Progressbar(self, length=300, maximum=1)
+        self.bar.pack(padx=10, pady=10)
+        self.update_idletasks()
+
+    def report(self, done, total):
+        self.bar.configure(maximum=max(total, 1), value=done)
+        self.update_idletasks()
+
+
+def run_with_progress(title, undo_manager, operation):
+    # operation(progress) returns the undoable action, or None when nothing changes
+    if not has_display():
+        action = operation(None)
+        if action is not None:
+            undo_manager.push(action)
+        return
+    window = ProgressWindow(title)
+    try:
+        try:
+            action = operation(window.report)
+        finally:
+            window.destroy()
+    except Exception as e:  # e.g. a bad pattern, keys that cannot be compared or a full temp dir
+        messagebox.showerror(title, f'{type(e).__name__}: {e}')
+        return
+    if action is not None:
+        undo_manager.push(action)
+
+
+class SortLinesPlugin(Plugin):
+    def get_name(self):
+        return 'Sort Lines'
+
+    def get_description(self):
+        return 'Sorts the selected lines (or the whole document) by a key, using the disk for large documents.'
+
+    def execute(self, model, undo_manager, clipboard):
+        if has_display():
+            spec = simpledialog.askstring(
+                'Sort Lines', 'Key: text, nocase, length, numeric, field:N or regex:PATTERN\n'
+                              '(a leading - sorts in descending order)', initialvalue='text')
+            if spec is None:
+                return
+            try:
+                key, reverse = sort_key(spec)
+            except (ValueError, re.error) as e:
+                messagebox.showerror('Sort Lines', str(e))
+                return
+        else:
+            key, reverse = sort_key(os.environ.get('GOATPAD_SORT_KEY', 'text'))
+        run_with_progress('Sort Lines', undo_manager,
+                          lambda progress: sort_action(model, key, reverse, progress=progress))
+
+
+class UniqueLinesPlugin(Plugin):
+    def get_name(self):
+        return 'Unique Lines'
+
+    def get_description(self):
+        return 'Removes repeated lines from the selection (or the whole document), keeping the first one.'
+
+    def execute(self, model, undo_manager, clipboard):
+        run_with_progress('Unique Lines', undo_manager,
+                          lambda progress: unique_action(model, progress=progress))
+
+
+class FilterLinesPlugin(Plugin):
+    def get_name(self):
+        return 'Filter Lines'
+
+    def get_description(self):
+        return 'Keeps only the lines that match a regular expression (a leading ! keeps the others).'
+
+    def execute(self, model, undo_manager, clipboard):
+        if has_display():
+            pattern = simpledialog.askstring('Filter Lines', 'Keep lines matching (a leading ! keeps the others):')
+        else:
+            pattern = os.environ.get('GOATPAD_FILTER_PATTERN')
+            if pattern is None:
+                raise ValueError('GOATPAD_FILTER_PATTERN is not set')
+        if not pattern:
+            return
+        pattern, invert = filter_pattern(pattern)
+        run_with_progress('Filter Lines', undo_manager,
+                          lambda progress: filter_action(model, pattern, invert, progress=progress))
@@ -0,0 +1,39 @@
+import os
+import importlib
+import inspect
+
+from plugins.plugin import Plugin
+
+
+def is_plugin(obj):
+    return inspect.isclass(obj) and obj.__bases__[0].__name__ == Plugin.__name__
+
+
+def load_plugins(plugins_dir='plugins', verbose=True):
+    # imports every module of the plugins directory and instantiates the Plugin classes it defines
+    plugins = []
+
+    if verbose:
+        print(f'Loading plugins...')
+
+    for filename in sorted(os.listdir(plugins_dir)):
+        if filename.endswith('.py') and filename != '__init__.py':
+            module_name = f'{os.path.basename(plugins_dir)}.{filename[:-3]}'
+            try:
+                module = importlib.import_module(module_name)
+                for name, obj in inspect.getmembers(module):
+
+                    if is_plugin(obj):
+                        plugin_instance = obj()  # create an instance of the plugin
+                        plugins.append(plugin_instance)
+                        if verbose:
+                            print(f'Plugin {plugin_instance.get_name()} loaded successfully.')
+            except Exception as e:
+                print(f'Failed to load plugin {filename}: {e}')
+
+    if verbose:
+        if not plugins:
+            print('No plugins found.')
+        else:
+            print(f'Loaded {len(plugins)} plugins.')
+    return plugins
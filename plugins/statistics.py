@@ -10,11 +10,11 @@ class StatisticsPlugin(Plugin):
         return 'Calculates statistics of the text, such as word count and character count.'
 
     def execute(self, model, undo_manager, clipboard):
-        text = model.get_text()
+        snapshot = model.snapshot()  # stable view, no copy of the whole text
         
-        line_count = len(model.lines)
-        word_count = len(text.split())
-        char_count = len(text)
+        line_count = len(snapshot)
+        word_count = sum(len(line.split()) for line in snapshot)
+        char_count = sum(len(line) for line in snapshot) + max(line_count - 1, 0)  # plus the newlines
         
         message = (
             f'Num rows: {line_count}\n'
@@ -0,0 +1,484 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import socket
+import stat
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import partial
+
+from commands.composite_action import CompositeAction
+from commands.delete_action import DeleteAction
+from commands.insert_text_action import InsertTextAction
+from observers.text.text_observer import TextObserver
+from position.location import Location
+from position.location_range import LocationRange
+
+
+STREAM_LIMIT = 64 * 1024 * 1024  # longest accepted request line
+READ_CHUNK_SIZE = 256 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# --- Dispatchers ---
+# every operation touching a model runs through a dispatcher, so that models owned by
+# the Tk main loop are only ever modified on the Tk thread
+
+class _CompletedCall:
+    # cheap stand-in for an already finished concurrent.futures.Future
+    __slots__ = ('value', 'error')
+
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+
+    def done(self):
+        return True
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def exception(self):
+        return self.error
+
+
+@contextmanager
+def suspended_notifications(workspace):
+    # model and undo history observers of every document are notified once, when the group ends
+    with ExitStack() as stack:
+        for document in workspace.documents:
+            stack.enter_context(document.model.suspend_notifications())
+            stack.enter_context(document.undo_manager.suspend_notifications())
+        yield
+
+
+class InlineDispatcher:
+    # runs operations directly on the server's event loop (headless workspace)
+    def __init__(self, workspace=None):
+        self.workspace = workspace
+
+    def group(self):
+        # the requests that arrived together are one group
+        return suspended_notifications(self.workspace) if self.workspace is not None else nullcontext()
+
+    def submit(self, fn):
+        try:
+            return _CompletedCall(fn())
+        except Exception as e:
+            return _CompletedCall(error=e)
+
+
+class TkDispatcher:
+    # queues operations for the Tk thread, which runs everything that is pending in one go
+    def __init__(self, root, workspace, interval=5, time_slice=0.02):
+        self.root = root
+        self.workspace = workspace
+        self.interval = interval
+        self.time_slice = time_slice
+        self.jobs = queue.SimpleQueue()
+        self.root.after(self.interval, self._pump)
+
+    def group(self):
+        return nullcontext()  # operations run on the Tk thread, grouped per pump
+
+    def submit(self, fn):
+        future = Future()
+        self.jobs.put((fn, future))
+        return future
+
+    def _pump(self):
+        deadline = time.perf_counter() + self.time_slice
+        # the editor is redrawn (and the undo/redo state updated) once per pump, not once per operation
+        with suspended_notifications(self.workspace):
+            while time.perf_counter() < deadline:
+                try:
+                    fn, future = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    future.set_result(fn())
+                except Exception as e:
+                    future.set_exception(e)
+        self.root.after(self.interval, self._pump)
+
+
+class _Subscription(TextObserver):
+    # forwards text changes of one buffer to a client, coalescing bursts into one notification
+    def __init__(self, connection, buffer_id, model):
+        self.connection = connection
+        self.buffer_id = buffer_id
+        self.model = model
+        self.version = 0
+        self.pending = False
+
+    def update_text(self):
+        self.version += 1
+        if not self.pending:
+            self.pending = True
+            self.connection.loop.call_soon_threadsafe(self.flush)
+
+    def flush(self):
+        self.pending = False
+        self.connection.send({'event': 'change', 'buffer': self.buffer_id,
+                              'version': self.version, 'lines': len(self.model.lines)})
+
+
+class _Connection:
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+        self.subscriptions = {}
+        # (request id, future) in request order, responses are sent in the same order
+        self.pending = deque()
+        self.flush_scheduled = False
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message, separators=(',', ':')).encode('utf-8') + b'\n')
+
+    def flush_responses(self):
+        self.flush_scheduled = False
+        pending = self.pending
+        while pending and pending[0][1].done():
+            request_id, future = pending.popleft()
+            error = future.exception()
+            if error is None:
+                self.send({'id': request_id, 'ok': True, 'result': future.result()})
+            else:
+                self.send({'id': request_id, 'ok': False, 'error': str(error)})
+
+    def schedule_flush(self, future=None):
+        # called from the dispatcher thread when an operation finishes there
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_soon_threadsafe(self.flush_responses)
+
+
+class AutomationServer:
+    def __init__(self, workspace, socket_path, dispatcher=None):
+        self.workspace = workspace
+        self.socket_path = socket_path
+        self.dispatcher = dispatcher or InlineDispatcher(workspace)
+        self.server = None
+        self.loop = None
+        self.buffer_ids = {}  # document -> buffer id
+        self.buffers = {}  # buffer id -> document
+        self.next_buffer_id = 1
+
+        self.operations = {
+            'new': self._op_new,
+            'open': self._op_open,
+            'close': self._op_close,
+            'list': self._op_list,
+            'get_text': self._op_get_text,
+            'set_text': self._op_set_text,
+            'get_range': self._op_get_range,
+            'get_lines': self._op_get_lines,
+            'get_cursor': self._op_get_cursor,
+            'set_cursor': self._op_set_cursor,
+            'insert': self._op_insert,
+            'delete': self._op_delete,
+            'replace': self._op_replace,
+            'batch': self._op_batch,
+            'undo': self._op_undo,
+            'redo': self._op_redo,
+            'subscribe': self._op_subscribe,
+            'unsubscribe': self._op_unsubscribe,
+        }
+        # operations that can be part of a batch frame
+        self.edit_operations = {
+            'insert': self._insert_factories,
+            'delete': self._delete_factories,
+            'replace': self._replace_factories,
+        }
+
+    # --- Server lifecycle ---
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        if os.path.lexists(self.socket_path):
+            self._remove_stale_socket()
+        self.server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+
+    def _remove_stale_socket(self):
+        # the socket of a previous run is removed, but never a regular file or the socket of a live server
+        if not stat.S_ISSOCK(os.lstat(self.socket_path).st_mode):
+            raise OSError(f'{self.socket_path} exists and is not a socket')
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except ConnectionRefusedError:
+            os.remove(self.socket_path)
+            return
+        finally:
+            probe.close()
+        raise OSError(f'another server is listening on {self.socket_path}')
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_in_thread(self):
+        # runs the server on its own event loop so it never blocks the Tk main loop
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve_forever()),
+                                  name='goatpad-automation', daemon=True)
+        thread.start()
+        return thread
+
+    # --- Connection handling ---
+    async def _handle_client(self, reader, writer):
+        connection = _Connection(self.loop, writer)
+        buffered = b''
+        try:
+            while True:
+                # everything that arrived is handled at once, a pipelining client
+                # gets many requests processed per event loop iteration
+                chunk = await reader.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffered += chunk
+                if len(buffered) > STREAM_LIMIT:
+                    raise ValueError('request line too long')
+                *lines, buffered = buffered.split(b'\n')
+                with self.dispatcher.group():
+                    for line in lines:
+                        if line.strip():
+                            connection.pending.append(self._submit(connection, line))
+                connection.flush_responses()
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            connection.send({'id': None, 'ok': False, 'error': f'connection error: {e}'})
+        finally:
+            if connection.subscriptions:
+                future = self.dispatcher.submit(partial(self._drop_subscriptions, connection))
+                if not future.done():
+                    await asyncio.wrap_future(future)
+            writer.close()
+
+    def _submit(self, connection, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ProtocolError('request must be a JSON object')
+        except (ValueError, ProtocolError) as e:
+            return None, _CompletedCall(error=ProtocolError(f'invalid request: {e}'))
+        future = self.dispatcher.submit(partial(self._execute, connection, request))
+        if not future.done():
+            future.add_done_callback(connection.schedule_flush)
+        return request.get('id'), future
+
+    def _execute(self, connection, request):
+        operation = self.operations.get(request.get('op'))
+        if operation is None:
+            raise ProtocolError(f'unknown operation: {request.get("op")!r}')
+        return operation(connection, request)
+
+    # --- Helpers ---
+    def _buffer_id(self, document):
+        if document not in self.buffer_ids:
+            self.buffer_ids[document] = self.next_buffer_id
+            self.buffers[self.next_buffer_id] = document
+            self.next_buffer_id += 1
+        return self.buffer_ids[document]
+
+    def _document(self, request):
+        buffer_id = request.get('buffer')
+        if buffer_id is None and self.workspace.active_document is not None:
+            document = self.workspace.active_document
+        else:
+            document = self.buffers.get(buffer_id)
+        if document is None or document not in self.workspace.documents:
+            raise ProtocolError(f'unknown buffer: {buffer_id!r}')
+        self.workspace.ensure_resident(document)
+        return document
+
+    @staticmethod
+    def _location(model, value, name):
+        try:
+            row, column = value
+        except (TypeError, ValueError):
+            raise ProtocolError(f'{name} must be [row, column]')
+        if not (isinstance(row, int) and isinstance(column, int) and
+                0 <= row < len(model.lines) and 0 <= column <= len(model.lines[row])):
+            raise ProtocolError(f'{name} out of bounds: {value!r}')
+        return Location(row, column)
+
+    def _range(self, model, request):
+        return LocationRange(self._location(model, request.get('start'), 'start'),
+                             self._location(model, request.get('end'), 'end'))
+
+    def _describe(self, document):
+        return {'buffer': self._buffer_id(document), 'path': document.file_path,
+                'title': document.title, 'lines': len(document.model.lines)}
+
+    # --- Buffer operations ---
+    def _op_new(self, connection, request):
+        return self._describe(self.workspace.new_document(request.get('text', '')))
+
+    def _op_open(self, connection, request):
+        return self._describe(self.workspace.open_document(request['path']))
+
+    def _op_close(self, connection, request):
+        document = self._document(request)
+        self.workspace.close_document(document)
+        buffer_id = self.buffer_ids.pop(document, None)  # documents nobody asked about have no id
+        if buffer_id is not None:
+            del self.buffers[buffer_id]
+        return None
+
+    def _op_list(self, connection, request):
+        return [self._describe(document) for document in self.workspace.documents]
+
+    # --- Query operations ---
+    def _op_get_text(self, connection, request):
+        return self._document(request).model.get_text()
+
+    def _op_get_range(self, connection, request):
+        model = self._document(request).model
+        return model.get_text_from_range(self._range(model, request))
+
+    def _op_get_lines(self, connection, request):
+        model = self._document(request).model
+        start = request.get('start', 0)
+        end = request.get('end', len(model.lines))
+        return model.lines[start:end]
+
+    def _op_get_cursor(self, connection, request):
+        model = self._document(request).model
+        location = model.get_cursor_location()
+        return [location.row, location.column]
+
+    def _op_set_cursor(self, connection, request):
+        model = self._document(request).model
+        location = self._location(model, request.get('at'), 'at')
+        model.set_cursor_location(location)
+        model.set_selection_range(location, location)
+        return None
+
+    # --- Edit operations ---
+    # every edit is described by a list of action factories, so a batch frame can
+    # combine the edits of all its operations into one CompositeAction (one undo step)
+    def _insert_factories(self, model, request):
+        at = self._location(model, request.get('at'), 'at')
+        text = request.get('text', '')
+        return [lambda: InsertTextAction(model, text, at)]
+
+    def _delete_factories(self, model, request):
+        selection = self._range(model, request)
+        return [lambda: DeleteAction(model, selection)]
+
+    def _replace_factories(self, model, request):
+        selection = self._range(model, request)
+        text = request.get('text', '')
+        return [lambda: DeleteAction(model, selection),
+                lambda: InsertTextAction(model, text, selection.start)]
+
+    def _push_edit(self, document, factories):
+        document.undo_manager.push(CompositeAction(document.model, factories))
+        location = document.model.get_cursor_location()
+        return {'cursor': [location.row, location.column], 'lines': len(document.model.lines)}
+
+    def _op_insert(self, connection, request):
+        document = self._document(request)
+        return self._push_edit(document, self._insert_factories(document.model, request))
+
+    def _op_delete(self, connection, request):
+        document = self._document(request)
+        return self._push_edit(document, self._delete_factories(document.model, request))
+
+    def _op_replace(self, connection, request):
+        document = self._document(request)
+        return self._push_edit(document, self._replace_factories(document.model, request))
+
+    def _op_set_text(self, connection, request):
+        document = self._document(request)
+        model = document.model
+        everything = LocationRange(Location(0, 0), Location(len(model.lines) - 1, len(model.lines[-1])))
+        text = request.get('text', '')
+        return self._push_edit(document, [lambda: DeleteAction(model, everything),
+                                          lambda: InsertTextAction(model, text, Location(0, 0))])
+
+    def _op_batch(self, connection, request):
+        document = self._document(request)
+        model = document.model
+        operations = request.get('ops')
+        if not isinstance(operations, list):
+            raise ProtocolError('batch needs a list of ops')
+
+        def factories():
+            # locations of later operations refer to the document after the earlier ones were applied
+            for operation in operations:
+                factory = self.edit_operations.get(operation.get('op'))
+                if factory is None:
+                    raise ProtocolError(f'operation not allowed in a batch: {operation.get("op")!r}')
+                yield from factory(model, operation)
+
+        return self._push_edit(document, factories())
+
+    def _op_undo(self, connection, request):
+        document = self._document(request)
+        document.undo_manager.undo()
+        return None
+
+    def _op_redo(self, connection, request):
+        document = self._document(request)
+        document.undo_manager.redo()
+        return None
+
+    # --- Subscriptions ---
+    def _op_subscribe(self, connection, request):
+        document = self._document(request)
+        buffer_id = self._buffer_id(document)
+        if buffer_id not in connection.subscriptions:
+            subscription = _Subscription(connection, buffer_id, document.model)
+            document.model.add_text_observer(subscription)
+            connection.subscriptions[buffer_id] = subscription
+        return {'buffer': buffer_id}
+
+    def _op_unsubscribe(self, connection, request):
+        document = self._document(request)
+        subscription = connection.subscriptions.pop(self._buffer_id(document), None)
+        if subscription is not None:
+            document.model.remove_text_observer(subscription)
+        return None
+
+    def _drop_subscriptions(self, connection):
+        for subscription in connection.subscriptions.values():
+            if subscription in subscription.model.text_observers:
+                subscription.model.remove_text_observer(subscription)
+        connection.subscriptions.clear()
+
+
+def main(argv=None):
+    # standalone headless server working on its own workspace
+    from workspace.document_workspace import Workspace
+
+    parser = argparse.ArgumentParser(description='GoatPad automation server (line-delimited JSON over a Unix socket).')
+    parser.add_argument('--socket', default='/tmp/goatpad.sock', help='path of the Unix domain socket')
+    args = parser.parse_args(argv)
+
+    server = AutomationServer(Workspace(), args.socket)
+    print(f'GoatPad automation server listening on {args.socket}')
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f'Could not start the server: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import os
+
+
+DICTIONARY_PATHS = (
+    os.environ.get('GOATPAD_DICTIONARY'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'words.txt'),  # optional bundled list
+    '/usr/share/dict/words',
+    '/usr/share/dict/american-english',
+    '/usr/share/dict/british-english',
+)
+
+
+class SpellDictionary:
+    # the word list is kept as one frozenset of lower case words, lookups are O(1)
+    def __init__(self, words=()):
+        self.words = frozenset(word.lower() for word in words)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+            return cls(line.strip() for line in file if line.strip())
+
+    @classmethod
+    def load_default(cls):
+        # returns None when no word list is available, spell checking is then disabled
+        for path in DICTIONARY_PATHS:
+            if path and os.path.isfile(path):
+                return cls.load(path)
+        return None
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word.lower() in self.words
@@ -0,0 +1,85 @@
+import re
+import time
+
+from observers.lines.line_observer import LineObserver
+
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+
+class SpellChecker(LineObserver):
+    # keeps the misspellings of every line in a list parallel to the document lines;
+    # None marks a line that was changed and still has to be checked
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.model = None
+        self.results = []
+        self.scan_position = 0  # where the idle pass continues looking for unchecked lines
+        self.cache = {}  # word -> is it spelled correctly
+
+    def attach(self, model):
+        if self.model is not None:
+            self.model.remove_line_observer(self)
+        self.model = model
+        self.results = [None] * len(model.lines)
+        self.scan_position = 0
+        model.add_line_observer(self)
+
+    def detach(self):
+        if self.model is not None:
+            self.model.remove_line_observer(self)
+        self.model = None
+        self.results = []
+
+    # --- Observer methods ---
+    def update_lines(self, start_row, removed_count, inserted_count):
+        # only the damaged lines are invalidated, everything else keeps its result
+        self.results[start_row:start_row + removed_count] = [None] * inserted_count
+        self.scan_position = min(self.scan_position, start_row)
+
+    # --- Checking ---
+    def is_correct(self, word):
+        correct = self.cache.get(word)
+        if correct is None:
+            correct = len(word) < 2 or word in self.dictionary
+            if len(self.cache) > 100000:
+                self.cache.clear()
+            self.cache[word] = correct
+        return correct
+
+    def check_line(self, line):
+        return [(match.start(), match.end()) for match in WORD_PATTERN.finditer(line)
+                if not self.is_correct(match.group())]
+
+    def misspellings(self, row):
+        # misspelled (start, end) columns of a row, the row is checked now if it is not yet
+        result = self.results[row]
+        if result is None:
+            result = self.results[row] = self.check_line(self.model.lines[row])
+        return result
+
+    def check_range(self, first_row, last_row):
+        # checks the rows that are visible, they have priority over the rest of the document
+        for row, line in enumerate(self.model.lines_range(first_row, last_row), first_row):
+            if self.results[row] is None:
+                self.results[row] = self.check_line(line)
+
+    def has_unchecked(self):
+        try:
+            self.scan_position = self.results.index(None, self.scan_position)
+            return True
+        except ValueError:
+            self.scan_position = len(self.results)
+            return False
+
+    def check_some(self, time_budget=0.01):
+        # idle work: checks unchecked lines for at most time_budget seconds, returns True if some remain
+        deadline = time.perf_counter() + time_budget
+        lines = self.model.lines
+        while self.has_unchecked():
+            row = self.scan_position
+            self.results[row] = self.check_line(lines[row])
+            self.scan_position = row + 1
+            if time.perf_counter() > deadline:
+                return self.has_unchecked()
+        return False
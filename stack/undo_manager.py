@@ -1,57 +1,270 @@
+import time
+from bisect import bisect_right
+from collections import Counter
+from contextlib import contextmanager
+
 from commands.edit_action import EditAction
 from observers.stack.undo_manager_observer import UndoManagerObserver
+from position.location import Location
+from position.location_range import LocationRange
+
+
+CHECKPOINT_INTERVAL = 50  # every n-th state along a branch keeps a snapshot of the document
+
+
+class UndoNode:
+    # one state of the document, reached from its parent by executing the command
+    __slots__ = ('command', 'parent', 'children', 'redo_child', 'number', 'depth', 'timestamp', 'checkpoint')
+
+    def __init__(self, command, parent, number, timestamp):
+        self.command = command
+        self.parent = parent
+        self.children = []
+        self.redo_child = None  # the child that redo() moves to (the most recently visited one)
+        self.number = number
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.timestamp = timestamp
+        self.checkpoint = None
+
 
 class UndoManager:
     _instance = None
 
-    def __init__(self):
-        if UndoManager._instance is not None:
-            raise Exception("This class is a singleton!")
-        else:
-            self.undo_stack = []
-            self.redo_stack = []
-            self.observers = []
+    def __init__(self, checkpoint_interval=CHECKPOINT_INTERVAL):
+        # every document owns its own undo manager, get_instance() returns the shared default one
+        # the history is a tree, an edit after undo starts a new branch instead of dropping the old one
+        self.checkpoint_interval = checkpoint_interval
+        self.model = None
+        self.observers = []
+        self._notifications_suspended = 0
+        self._pending_notification = False
+        self._reset()
 
     @staticmethod
     def get_instance():
-        """Statička metoda za dohvaćanje jedine instance."""
+        """Static method for retrieving the default (shared) instance."""
         if UndoManager._instance is None:
             UndoManager._instance = UndoManager()
         return UndoManager._instance
 
+    def _reset(self):
+        self.root = UndoNode(None, None, 0, time.time())
+        self.current = self.root
+        self.nodes = [self.root]  # indexed by state number, in creation (and time) order
+        self.timestamps = [self.root.timestamp]
+        # memory accounting, updated when commands are added instead of walking the history
+        self.bytes_by_type = Counter()
+        self.count_by_type = Counter()
+        self.checkpoint_bytes = 0
+
+    def attach_model(self, model):
+        # the model is needed for checkpoints, the root state is the document as it is now
+        self.model = model
+        self._set_checkpoint(self.root)
+
     # --- Observer methods ---
     def add_observer(self, observer: UndoManagerObserver):
         self.observers.append(observer)
 
     def remove_observer(self, observer: UndoManagerObserver):
         self.observers.remove(observer)
-        
+
     def notify_observers(self):
-        is_undo_empty = not self.undo_stack
-        is_redo_empty = not self.redo_stack
+        if self._notifications_suspended:
+            self._pending_notification = True
+            return
+        is_undo_empty = not self.can_undo()
+        is_redo_empty = not self.can_redo()
         for observer in self.observers:
             observer.update_undo_stack(is_undo_empty)
             observer.update_redo_stack(is_redo_empty)
 
+    @contextmanager
+    def suspend_notifications(self):
+        # groups many pushes so that observers (and the UI) are updated only once
+        self._notifications_suspended += 1
+        try:
+            yield self
+        finally:
+            self._notifications_suspended -= 1
+            if not self._notifications_suspended and self._pending_notification:
+                self._pending_notification = False
+                self.notify_observers()
+
     # --- Undo/Redo methods ---
     def push(self, command: EditAction):
-        self.redo_stack.clear()  # adding a new command clears the redo stack
-        command.execute_do()
-        self.undo_stack.append(command)
+        command.execute_do()  # a command that fails leaves the history untouched
+        node = UndoNode(command, self.current, len(self.nodes), max(time.time(), self.timestamps[-1]))
+        self.current.children.append(node)
+        self.current.redo_child = node
+        self.current = node
+        self.nodes.append(node)
+        self.timestamps.append(node.timestamp)
+        self._account(node)
+        if node.depth % self.checkpoint_interval == 0:
+            self._set_checkpoint(node)
         self.notify_observers()
 
+    def can_undo(self):
+        return self.current is not self.root
+
+    def can_redo(self):
+        return self.current.redo_child is not None
+
     def undo(self):
-        if not self.undo_stack:
+        if not self.can_undo():
             return
-        command = self.undo_stack.pop()
-        command.execute_undo()
-        self.redo_stack.append(command)
+        node = self.current
+        node.command.execute_undo()
+        node.parent.redo_child = node
+        self.current = node.parent
         self.notify_observers()
 
     def redo(self):
-        if not self.redo_stack:
+        if not self.can_redo():
             return
-        command = self.redo_stack.pop()
-        command.execute_do()
-        self.undo_stack.append(command)
-        self.notify_observers()
\ No newline at end of file
+        node = self.current.redo_child
+        node.command.execute_do()
+        self.current = node
+        self.notify_observers()
+
+    # --- History navigation ---
+    def goto_state(self, number):
+        # moves the document to any state of the history tree, 0 is the initial document
+        if not 0 <= number < len(self.nodes):
+            raise IndexError('State out of range')
+        target = self.nodes[number]
+        if target is self.current:
+            return
+
+        path_down, undo_count = self._path_through_common_ancestor(target)
+        checkpoint_node = target
+        while checkpoint_node.checkpoint is None:
+            checkpoint_node = checkpoint_node.parent
+
+        with self.model.suspend_notifications():
+            if target.depth - checkpoint_node.depth < undo_count + len(path_down):
+                # restoring the checkpoint and replaying a short delta is cheaper
+                self._restore_checkpoint(checkpoint_node.checkpoint)
+                path_down = self._path_from(checkpoint_node, target)
+            else:
+                node = self.current
+                for _ in range(undo_count):
+                    node.command.execute_undo()
+                    node = node.parent
+            for node in path_down:
+                node.command.execute_do()
+            self.model.notify_text_observers()
+            self.model.notify_cursor_observers()
+
+        # redo from any node on the way leads back towards the target
+        for node in self._path_from(self.root, target):
+            node.parent.redo_child = node
+        self.current = target
+        self.notify_observers()
+
+    def goto_time(self, timestamp):
+        # moves to the last state that was created at or before the given time
+        index = bisect_right(self.timestamps, timestamp) - 1
+        self.goto_state(max(index, 0))
+
+    def current_state(self):
+        return self.current.number
+
+    def state_count(self):
+        return len(self.nodes)
+
+    def _path_from(self, ancestor, node):
+        path = []
+        while node is not ancestor:
+            path.append(node)
+            node = node.parent
+        path.reverse()
+        return path
+
+    def _path_through_common_ancestor(self, target):
+        # returns the nodes to redo below the common ancestor and the number of undo steps to reach it
+        a, b = self.current, target
+        undo_count = 0
+        path_down = []
+        while a.depth > b.depth:
+            a = a.parent
+            undo_count += 1
+        while b.depth > a.depth:
+            path_down.append(b)
+            b = b.parent
+        while a is not b:
+            a = a.parent
+            undo_count += 1
+            path_down.append(b)
+            b = b.parent
+        path_down.reverse()
+        return path_down, undo_count
+
+    def _take_checkpoint(self):
+        # snapshots share unchanged chunks with the document, so a checkpoint is cheap
+        cursor = self.model.get_cursor_location()
+        return self.model.snapshot(), (cursor.row, cursor.column)
+
+    def _restore_checkpoint(self, checkpoint):
+        snapshot, (row, column) = checkpoint
+        model = self.model
+        model.restore_snapshot(snapshot)
+        model.cursor_location = Location(row, column)
+        model.selection_range = LocationRange(Location(row, column), Location(row, column))
+
+    def _set_checkpoint(self, node):
+        node.checkpoint = self._take_checkpoint()
+        self.checkpoint_bytes += node.checkpoint[0].overhead_bytes()
+
+    def _account(self, node):
+        type_name = type(node.command).__name__
+        self.bytes_by_type[type_name] += node.command.estimate_size()
+        self.count_by_type[type_name] += 1
+        if node.checkpoint is not None:
+            self.checkpoint_bytes += node.checkpoint[0].overhead_bytes()
+
+    def estimated_bytes(self):
+        return sum(self.bytes_by_type.values()) + self.checkpoint_bytes
+
+    def commands(self):
+        # all commands of the history, on every branch
+        return (node.command for node in self.nodes[1:])
+
+    # --- History persistence ---
+    def export_history(self):
+        # returns a flat, picklable view of the history (used when a document is evicted),
+        # the tree itself is too deep to be pickled recursively
+        nodes = [(node.parent.number, node.command, node.timestamp, node.checkpoint) for node in self.nodes[1:]]
+        redo_children = {node.number: node.redo_child.number for node in self.nodes if node.redo_child is not None}
+        return {
+            'root': (self.root.timestamp, self.root.checkpoint),
+            'nodes': nodes,
+            'redo_children': redo_children,
+            'current': self.current.number,
+        }
+
+    def import_history(self, history):
+        self._reset()
+        self.root.timestamp, self.root.checkpoint = history['root']
+        self.timestamps[0] = self.root.timestamp
+        if self.root.checkpoint is not None:
+            self.checkpoint_bytes += self.root.checkpoint[0].overhead_bytes()
+        for parent_number, command, timestamp, checkpoint in history['nodes']:
+            parent = self.nodes[parent_number]
+            node = UndoNode(command, parent, len(self.nodes), timestamp)
+            node.checkpoint = checkpoint
+            parent.children.append(node)
+            self.nodes.append(node)
+            self.timestamps.append(timestamp)
+            self._account(node)
+        for number, child_number in history['redo_children'].items():
+            self.nodes[number].redo_child = self.nodes[child_number]
+        self.current = self.nodes[history['current']]
+        self.notify_observers()
+
+    def clear(self):
+        self._reset()
+        if self.model is not None:
+            self._set_checkpoint(self.root)
+        self.notify_observers()
@@ -0,0 +1,97 @@
+import os
+
+from commands.replace_lines_action import ReplaceLinesAction
+from watcher.line_diff import diff_lines
+from workspace.document import normalize_newlines, read_text
+
+
+POLL_INTERVAL = 1000  # ms
+
+
+class FileWatcher:
+    # polls the file of the active document (mtime/size/inode) and applies external changes incrementally
+    def __init__(self, root, workspace, interval=POLL_INTERVAL, confirm_reload=None):
+        self.root = root
+        self.workspace = workspace
+        self.interval = interval
+        # called with the document before unsaved changes are replaced by the file contents
+        self.confirm_reload = confirm_reload or (lambda document: True)
+
+    def start(self):
+        self.root.after(self.interval, self._tick)
+
+    def _tick(self):
+        try:
+            self.check(self.workspace.active_document)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f'Could not reload file: {e}')
+        self.root.after(self.interval, self._tick)
+
+    def check(self, document):
+        if document is None or document.file_path is None or document.disk_state is None:
+            return False
+        try:
+            stat = os.stat(document.file_path)
+        except FileNotFoundError:
+            return False
+        mtime_ns, size, inode = document.disk_state
+        if (stat.st_mtime_ns, stat.st_size, stat.st_ino) == (mtime_ns, size, inode):
+            return False
+
+        if stat.st_ino == inode and stat.st_size > size and self._tail_unchanged(document, size):
+            return self._load_appended(document, size)
+        return self._reload(document)
+
+    def _tail_unchanged(self, document, size):
+        with open(document.file_path, 'rb') as file:
+            file.seek(size - len(document.disk_tail))
+            return file.read(len(document.disk_tail)) == document.disk_tail
+
+    def _load_appended(self, document, size):
+        # only the new bytes at the end of the file are read
+        with open(document.file_path, 'rb') as file:
+            file.seek(size)
+            data = file.read()
+        if data.endswith(b'\r'):
+            data = data[:-1]  # may be the first half of a '\r\n', wait for the next poll
+        text, consumed = _decode_complete(data)
+        if document.disk_tail.endswith(b'\r') and text.startswith('\n'):
+            text = text[1:]  # the '\r' before it already ended the line
+        if not text:
+            if consumed:
+                document.record_disk_state(size + consumed)
+            return False
+        model = document.model
+        was_modified = document.modified
+        parts = normalize_newlines(text).split('\n')
+        last_row = len(model.lines) - 1
+        last_line = model.lines[last_row]
+        hunk = (last_row, [last_line], [last_line + parts[0]] + parts[1:])
+        document.undo_manager.push(ReplaceLinesAction(model, [hunk]))
+        if not was_modified:
+            document.mark_saved()
+        document.record_disk_state(size + consumed)
+        return True
+
+    def _reload(self, document):
+        # the file was rewritten, only the changed hunks are applied (as one undoable edit)
+        if document.modified and not self.confirm_reload(document):
+            document.record_disk_state()  # keep the user's version, don't ask again for this change
+            return False
+        text, size = read_text(document.file_path)
+        hunks = diff_lines(list(document.model.lines), text.split('\n'))
+        if hunks:
+            document.undo_manager.push(ReplaceLinesAction(document.model, hunks))
+        document.mark_saved()
+        document.record_disk_state(size)
+        return bool(hunks)
+
+
+def _decode_complete(data):
+    # a writer may still be in the middle of a multi-byte character, leave it for the next poll
+    for cut in range(min(len(data), 4)):
+        try:
+            return data[:len(data) - cut].decode('utf-8'), len(data) - cut
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8'), len(data)
@@ -0,0 +1,151 @@
+from bisect import bisect_left
+
+
+MAX_EDIT_DISTANCE = 400  # a gap without unique lines that needs more edits than this is replaced as a whole
+MAX_DIFF_WORK = 4000000  # line comparisons a Myers diff of one gap may make before it gives up the same way
+
+
+def diff_lines(old, new):
+    # returns the hunks (start_row, old_lines, new_lines) that turn old into new;
+    # patience diff: lines that occur once in both sides are matched first (in order), and the gaps
+    # between them are diffed the same way. Gaps without such anchors (e.g. repetitive log lines) use
+    # a Myers O(ND) diff bounded by MAX_EDIT_DISTANCE and MAX_DIFF_WORK, so the work on the Tk thread stays bounded
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in old]  # ints compare faster than lines
+    b = [ids.setdefault(line, len(ids)) for line in new]
+
+    matches = []  # (old_row, new_row, length) of equal runs
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        old_start, old_stop, new_start, new_stop = ranges.pop()
+        # the common prefix and suffix of the gap
+        start = 0
+        while old_start + start < old_stop and new_start + start < new_stop \
+                and a[old_start + start] == b[new_start + start]:
+            start += 1
+        if start:
+            matches.append((old_start, new_start, start))
+            old_start += start
+            new_start += start
+        stop = 0
+        while old_start < old_stop - stop and new_start < new_stop - stop \
+                and a[old_stop - 1 - stop] == b[new_stop - 1 - stop]:
+            stop += 1
+        if stop:
+            old_stop -= stop
+            new_stop -= stop
+            matches.append((old_stop, new_stop, stop))
+        if old_start == old_stop or new_start == new_stop:
+            continue
+
+        anchors = _unique_anchors(a, old_start, old_stop, b, new_start, new_stop)
+        if anchors:
+            previous_old, previous_new = old_start, new_start
+            for old_row, new_row in anchors:
+                matches.append((old_row, new_row, 1))
+                ranges.append((previous_old, old_row, previous_new, new_row))
+                previous_old, previous_new = old_row + 1, new_row + 1
+            ranges.append((previous_old, old_stop, previous_new, new_stop))
+        else:
+            matches.extend(_myers(a, old_start, old_stop, b, new_start, new_stop, MAX_EDIT_DISTANCE))
+
+    hunks = []
+    old_row = new_row = 0
+    for match_old, match_new, length in sorted(matches) + [(len(a), len(b), 0)]:
+        if match_old > old_row or match_new > new_row:
+            hunks.append((old_row, old[old_row:match_old], new[new_row:match_new]))
+        old_row, new_row = match_old + length, match_new + length
+    return hunks
+
+
+def _unique_anchors(a, old_start, old_stop, b, new_start, new_stop):
+    # the longest in-order chain of lines that occur exactly once in both ranges, as (old_row, new_row)
+    counts = {}
+    for row in range(old_start, old_stop):
+        line = a[row]
+        counts[line] = row if line not in counts else -1
+    in_new = {}
+    for row in range(new_start, new_stop):
+        line = b[row]
+        if counts.get(line, -1) >= 0:
+            in_new[line] = row if line not in in_new else -1
+    pairs = [(counts[line], row) for line, row in in_new.items() if row >= 0]
+    if not pairs:
+        return []
+    pairs.sort()
+
+    # patience sorting: the longest increasing subsequence of the new rows
+    tails = []  # new row ending the best chain of each length
+    tail_indexes = []
+    previous = [-1] * len(pairs)
+    for index, (_, new_row) in enumerate(pairs):
+        position = bisect_left(tails, new_row)
+        if position:
+            previous[index] = tail_indexes[position - 1]
+        if position == len(tails):
+            tails.append(new_row)
+            tail_indexes.append(index)
+        else:
+            tails[position] = new_row
+            tail_indexes[position] = index
+    chain = []
+    index = tail_indexes[-1]
+    while index >= 0:
+        chain.append(pairs[index])
+        index = previous[index]
+    chain.reverse()
+    return chain
+
+
+def _myers(a, old_start, old_stop, b, new_start, new_stop, max_distance):
+    # equal runs (old_row, new_row, length) of a shortest edit script, or none at all when it needs
+    # more than max_distance insertions and deletions or MAX_DIFF_WORK comparisons (the whole range
+    # is replaced then)
+    n, m = old_stop - old_start, new_stop - new_start
+    max_distance = min(max_distance, n + m)
+    offset = max_distance + 1
+    furthest = [0] * (2 * max_distance + 3)  # furthest x reached on every diagonal k = x - y
+    trace = []
+    work = 0
+    for distance in range(max_distance + 1):
+        trace.append(furthest[:])
+        for k in range(-distance, distance + 1, 2):
+            if k == -distance or (k != distance and furthest[offset + k - 1] < furthest[offset + k + 1]):
+                x = furthest[offset + k + 1]  # down: an inserted line
+            else:
+                x = furthest[offset + k - 1] + 1  # right: a deleted line
+            y = x - k
+            start_x = x
+            while x < n and y < m and a[old_start + x] == b[new_start + y]:
+                x += 1
+                y += 1
+            furthest[offset + k] = x
+            work += x - start_x + 1
+            if work > MAX_DIFF_WORK:
+                return []
+            if x >= n and y >= m:
+                return _myers_matches(trace, offset, distance, n, m, old_start, new_start)
+    return []
+
+
+def _myers_matches(trace, offset, distance, x, y, old_start, new_start):
+    # walks the furthest points back from the end and collects the diagonal runs
+    matches = []
+    for d in range(distance, -1, -1):
+        furthest = trace[d]
+        k = x - y
+        if d == 0:
+            previous_x = previous_y = 0
+            start_x = 0
+        else:
+            if k == -d or (k != d and furthest[offset + k - 1] < furthest[offset + k + 1]):
+                previous_k = k + 1
+            else:
+                previous_k = k - 1
+            previous_x = furthest[offset + previous_k]
+            previous_y = previous_x - previous_k
+            start_x = previous_x if previous_k == k + 1 else previous_x + 1  # after the edit step
+        if x > start_x:
+            matches.append((old_start + start_x, new_start + start_x - k, x - start_x))
+        x, y = previous_x, previous_y
+    return matches
@@ -0,0 +1,177 @@
+import os
+import io
+import pickle
+import tempfile
+import zlib
+from itertools import count
+
+from editor.text_editor_model import TextEditorModel
+from stack.undo_manager import UndoManager
+from observers.stack.undo_manager_observer import UndoManagerObserver
+from position.location import Location
+from position.location_range import LocationRange
+
+
+_untitled_counter = count(1)
+DISK_TAIL_SIZE = 4096  # bytes remembered from the end of the file to recognise appends
+
+
+def normalize_newlines(text):
+    # the same line ends as reading in text mode (universal newlines)
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def read_text(file_path):
+    # the contents and the number of bytes they were read from, so the disk state never
+    # includes data appended after the read
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    return normalize_newlines(data.decode('utf-8')), len(data)
+
+
+class _ModelPickler(pickle.Pickler):
+    # commands reference the model they edit, the model itself (with its observers) is never written
+    def __init__(self, file, model):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.model = model
+
+    def persistent_id(self, obj):
+        return 'model' if obj is self.model else None
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    def __init__(self, file, model):
+        super().__init__(file)
+        self.model = model
+
+    def persistent_load(self, pid):
+        if pid != 'model':
+            raise pickle.UnpicklingError(f'unsupported persistent id: {pid}')
+        return self.model
+
+
+class Document(UndoManagerObserver):
+    def __init__(self, text='', file_path=None):
+        self.file_path = file_path
+        self.untitled_number = None if file_path else next(_untitled_counter)
+
+        # each document has its own model and its own undo history
+        self.undo_manager = UndoManager()
+        self.model = TextEditorModel(text, undo_manager=self.undo_manager)
+        self.undo_manager.add_observer(self)
+
+        # the state of the undo history when the document was last saved/loaded
+        self.saved_marker = None
+        self.modified = False
+
+        self.evicted_path = None
+        self.last_activated = 0
+
+        # what the file on disk looked like when it was last loaded or saved
+        self.disk_state = None  # (mtime_ns, size, inode)
+        self.disk_tail = b''
+
+    @property
+    def title(self):
+        name = os.path.basename(self.file_path) if self.file_path else f'Untitled {self.untitled_number}'
+        return f'*{name}' if self.modified else name
+
+    def _history_marker(self):
+        return self.undo_manager.current
+
+    def mark_saved(self):
+        self.saved_marker = self._history_marker()
+        self.modified = False
+
+    # --- Observer methods ---
+    def update_undo_stack(self, is_empty: bool):
+        if not self.is_evicted():
+            self.modified = self._history_marker() is not self.saved_marker
+
+    def update_redo_stack(self, is_empty: bool):
+        pass
+
+    # --- File operations ---
+    def save(self, file_path=None):
+        if file_path is not None:
+            self.file_path = file_path
+        snapshot = self.model.snapshot()
+        with open(self.file_path, 'w', encoding='utf-8') as file:
+            for row, line in enumerate(snapshot):
+                if row:
+                    file.write('\n')
+                file.write(line)
+            size = file.tell()
+        self.mark_saved()
+        self.record_disk_state(size)
+
+    def record_disk_state(self, size=None):
+        # size is the number of bytes of the file that the buffer reflects (defaults to all of them)
+        stat = os.stat(self.file_path)
+        size = stat.st_size if size is None else size
+        self.disk_state = (stat.st_mtime_ns, size, stat.st_ino)
+        with open(self.file_path, 'rb') as file:
+            file.seek(max(size - DISK_TAIL_SIZE, 0))
+            self.disk_tail = file.read(min(size, DISK_TAIL_SIZE))
+
+    # --- Memory management ---
+    def estimate_memory(self):
+        if self.is_evicted():
+            return 0
+        return self.model.lines.estimated_bytes() + self.undo_manager.estimated_bytes()
+
+    def is_evicted(self):
+        return self.evicted_path is not None
+
+    def evict(self):
+        # moves the buffer and the undo history into a compressed temporary file
+        if self.is_evicted():
+            return
+        model = self.model
+        state = {
+            'lines': list(model.lines),
+            'history': self.undo_manager.export_history(),
+            'cursor': (model.cursor_location.row, model.cursor_location.column),
+            'selection': (model.selection_range.start.row, model.selection_range.start.column,
+                          model.selection_range.end.row, model.selection_range.end.column),
+            # the node number, pickling the node itself would pull in the whole tree through its links
+            'saved_marker': self.saved_marker.number if self.saved_marker is not None else None,
+        }
+        data = io.BytesIO()
+        _ModelPickler(data, model).dump(state)
+
+        with tempfile.NamedTemporaryFile(prefix='goatpad-', suffix='.evicted', delete=False) as file:
+            file.write(zlib.compress(data.getvalue()))
+            self.evicted_path = file.name
+
+        model.lines = ['']
+        model.cursor_location = Location(0, 0)
+        model.selection_range = LocationRange(Location(0, 0), Location(0, 0))
+        self.undo_manager.clear()
+        self.saved_marker = None
+
+    def restore(self):
+        # loads a previously evicted buffer and undo history back into memory
+        if not self.is_evicted():
+            return
+        with open(self.evicted_path, 'rb') as file:
+            data = zlib.decompress(file.read())
+        state = _ModelUnpickler(io.BytesIO(data), self.model).load()
+        os.remove(self.evicted_path)
+        self.evicted_path = None
+
+        model = self.model
+        model.lines = state['lines']
+        model.cursor_location = Location(*state['cursor'])
+        start_row, start_col, end_row, end_col = state['selection']
+        model.selection_range = LocationRange(Location(start_row, start_col), Location(end_row, end_col))
+        self.undo_manager.import_history(state['history'])
+        number = state['saved_marker']
+        self.saved_marker = self.undo_manager.nodes[number] if number is not None else None
+        self.modified = self._history_marker() is not self.saved_marker
+
+    def discard(self):
+        # removes the on-disk copy of an evicted document that is being closed
+        if self.is_evicted():
+            os.remove(self.evicted_path)
+            self.evicted_path = None
@@ -0,0 +1,88 @@
+from itertools import count
+
+from workspace.document import Document, read_text
+from observers.workspace.workspace_observer import WorkspaceObserver
+
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024  # bytes kept in memory by all resident documents
+
+
+class Workspace:
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        self.documents = []
+        self.active_document = None
+        self.memory_budget = memory_budget
+        self.observers = []
+        self._activation_counter = count(1)
+
+    # --- Observer methods ---
+    def add_observer(self, observer: WorkspaceObserver):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: WorkspaceObserver):
+        self.observers.remove(observer)
+
+    def notify_observers(self):
+        for observer in self.observers:
+            observer.update_documents()
+
+    # --- Document methods ---
+    def new_document(self, text='', file_path=None):
+        document = Document(text, file_path)
+        document.mark_saved()
+        self.documents.append(document)
+        self.activate(document)
+        return document
+
+    def open_document(self, file_path):
+        # a file that is already open is only activated
+        for document in self.documents:
+            if document.file_path == file_path:
+                self.activate(document)
+                return document
+        content, size = read_text(file_path)
+        document = self.new_document(content, file_path)
+        document.record_disk_state(size)
+        return document
+
+    def close_document(self, document):
+        index = self.documents.index(document)
+        self.documents.remove(document)
+        document.discard()
+
+        if document is self.active_document:
+            self.active_document = None
+            if self.documents:
+                self.activate(self.documents[min(index, len(self.documents) - 1)])
+                return
+        self.notify_observers()
+
+    def activate(self, document):
+        if document not in self.documents:
+            raise ValueError('Document is not part of the workspace')
+        document.restore()
+        document.last_activated = next(self._activation_counter)
+        self.active_document = document
+        self.enforce_memory_budget()
+        self.notify_observers()
+
+    def ensure_resident(self, document):
+        # restores a document that is used in the background (e.g. by the automation server) without activating it
+        document.last_activated = next(self._activation_counter)
+        if document.is_evicted():
+            document.restore()
+            self.enforce_memory_budget(keep=document)
+
+    def resident_documents(self):
+        return [document for document in self.documents if not document.is_evicted()]
+
+    def enforce_memory_budget(self, keep=None):
+        # evicts the least recently activated documents until the resident ones fit into the budget
+        candidates = sorted((d for d in self.resident_documents() if d not in (self.active_document, keep)),
+                            key=lambda d: d.last_activated)
+        used = sum(document.estimate_memory() for document in self.resident_documents())
+        for document in candidates:
+            if used <= self.memory_budget:
+                break
+            used -= document.estimate_memory()
+            document.evict()